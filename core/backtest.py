@@ -0,0 +1,156 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from core.bar_store import BarStore
+
+DEFAULT_PARAMS = {"bias_th": -2.5, "vol_th": 1.2, "stop_loss": -1.5, "take_profit": 3.0, "hold_days": 4}
+
+class Backtester:
+    """
+    技术触发规则回测 (向量化): "乖离率 < bias_th 且 量比 > vol_th 收盘买入，止损 stop_loss% / 止盈 take_profit% / 持有 hold_days 天"。
+    全部标的的日线按日期对齐为 (日期 × 标的) 二维数组，信号与出场在整个面板上一次性计算。
+    - 乖离率: 收盘价相对 MA5 (含当日) 的偏离；量比: 当日成交量 / 前 5 日均量 (与实时口径一致)
+    - 出场: 之后每日先检查最低价触及止损、再检查最高价触及止盈 (同日均触及按止损计，偏保守)，到期按收盘价平仓
+    - 宏观过滤: macro_filter={"VIX": ("p_250d", "<", 80)}，取信号日收盘 (15:00) 前最近一条宏观特征
+    """
+    def __init__(self, bars_dir="data/bars", history_dir="data/history", codes=None):
+        self.bars = BarStore(bars_dir)
+        self.history_dir = history_dir
+        if codes is None:
+            codes = sorted(f[:-4] for f in os.listdir(bars_dir) if f.endswith(".csv"))
+        self.panel = self._load_panel(codes)
+
+    def _load_panel(self, codes):
+        frames = {}
+        for c in codes:
+            bars = self.bars.load(c)
+            if bars:
+                frames[c] = pd.DataFrame(bars).drop_duplicates("日期").set_index("日期")
+        dates = sorted(set().union(*(f.index for f in frames.values()))) if frames else []
+        panel = {"codes": list(frames), "dates": np.array(dates, dtype=str)}
+        for key, col in [("close", "收盘"), ("high", "最高"), ("low", "最低"), ("volume", "成交量")]:
+            panel[key] = np.column_stack([f[col].reindex(dates).to_numpy(dtype=float) for f in frames.values()]) if frames else np.empty((0, 0))
+        panel.update(_signal_inputs(panel["close"], panel["volume"]))
+        return panel
+
+    def macro_mask(self, macro_filter):
+        """按宏观条件生成 (日期 × 1) 布尔掩码；无对应历史的日期视为不满足。"""
+        from core.intel_engine import IntelEngine
+        engine = IntelEngine(history_dir=self.history_dir)
+        day_end = (pd.to_datetime(self.panel["dates"]) + pd.Timedelta(hours=15)).to_numpy().astype("datetime64[s]").astype(np.int64)
+        mask = np.ones(len(day_end), dtype=bool)
+        ops = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal}
+        for key, (feature, op, threshold) in macro_filter.items():
+            series = engine.get_feature_series(key)
+            if series is None:
+                mask[:] = False
+                continue
+            ts = series["timestamp"].to_numpy().astype("datetime64[s]").astype(np.int64)
+            idx = np.searchsorted(ts, day_end, side="right") - 1
+            vals = np.where(idx >= 0, series[feature].to_numpy()[np.clip(idx, 0, None)], np.nan)
+            with np.errstate(invalid='ignore'):
+                mask &= ops[op](vals, threshold)
+        return mask[:, None]
+
+    def run(self, macro_filter=None, **params):
+        mask = self.macro_mask(macro_filter) if macro_filter else None
+        return evaluate(self.panel, {**DEFAULT_PARAMS, **params}, mask)
+
+    def sweep(self, grid, macro_filter=None, processes=None):
+        """
+        参数网格扫描: grid = {"bias_th": [...], "vol_th": [...], ...}，未列出的参数取默认值。
+        面板数据只在每个工作进程初始化时传递一次。返回按平均收益降序排列的 [(参数, 统计)]。
+        """
+        keys = list(grid)
+        combos = [{**DEFAULT_PARAMS, **dict(zip(keys, values))} for values in itertools.product(*(grid[k] for k in keys))]
+        mask = self.macro_mask(macro_filter) if macro_filter else None
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(self.panel, mask)) as pool:
+            stats = list(pool.map(_sweep_worker, combos, chunksize=max(1, len(combos) // (4 * (processes or os.cpu_count() or 1)))))
+        results = list(zip(combos, stats))
+        results.sort(key=lambda r: -np.inf if r[1]["avg_return"] is None else r[1]["avg_return"], reverse=True)
+        return results
+
+def _signal_inputs(close, volume):
+    """预先计算与阈值无关的乖离率 / 量比面板，供所有参数组合复用。"""
+    T = close.shape[0]
+    bias = np.full(close.shape, np.nan)
+    vol_ratio = np.full(close.shape, np.nan)
+    if T >= 5:
+        ma5 = np.lib.stride_tricks.sliding_window_view(close, 5, axis=0).mean(axis=-1)
+        bias[4:] = (close[4:] / ma5 - 1) * 100
+    if T >= 6:
+        vol_avg = np.lib.stride_tricks.sliding_window_view(volume[:-1], 5, axis=0).mean(axis=-1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            vol_ratio[5:] = np.where(vol_avg > 0, volume[5:] / vol_avg, np.nan)
+    return {"bias": bias, "vol_ratio": vol_ratio}
+
+def evaluate(panel, params, mask=None):
+    close, high, low = panel["close"], panel["high"], panel["low"]
+    H = int(params["hold_days"])
+    T = close.shape[0]
+    with np.errstate(invalid='ignore'):
+        signal = (panel["bias"] < params["bias_th"]) & (panel["vol_ratio"] > params["vol_th"])
+    if mask is not None:
+        signal &= mask
+    # 只保留有完整持有期的信号
+    signal[max(0, T - H):] = False
+    t_idx, c_idx = np.nonzero(signal)
+    if len(t_idx) == 0:
+        return _summarize(panel, np.empty(0), np.empty(0, dtype=int), np.empty(0, dtype=int))
+
+    entry = close[t_idx, c_idx]
+    fwd = t_idx[None, :] + np.arange(1, H + 1)[:, None]          # (H, N)
+    lows, highs = low[fwd, c_idx], high[fwd, c_idx]
+    sl_price = entry * (1 + params["stop_loss"] / 100)
+    tp_price = entry * (1 + params["take_profit"] / 100)
+    with np.errstate(invalid='ignore'):
+        hit_sl = lows <= sl_price
+        hit_tp = highs >= tp_price
+    event = hit_sl | hit_tp
+    has_event = event.any(axis=0)
+    first = np.where(has_event, event.argmax(axis=0), H - 1)
+    cols = np.arange(len(t_idx))
+    exit_price = np.where(has_event & hit_sl[first, cols], sl_price,
+                 np.where(has_event, tp_price, close[t_idx + H, c_idx]))
+    returns = (exit_price / entry - 1) * 100
+    valid = ~np.isnan(returns)
+    return _summarize(panel, returns[valid], t_idx[valid], (t_idx + first + 1)[valid])
+
+def _summarize(panel, returns, entry_idx, exit_idx):
+    n = len(returns)
+    if n == 0:
+        return {"trades": 0, "hit_rate": None, "avg_return": None, "median_return": None,
+                "total_return": 0.0, "max_drawdown": 0.0, "by_year": {}}
+    # 净值: 同一天平仓的交易等权平均后按平仓日复利累积
+    T = len(panel["dates"])
+    day_sum = np.bincount(exit_idx, weights=returns, minlength=T)
+    day_cnt = np.bincount(exit_idx, minlength=T)
+    daily = np.divide(day_sum, day_cnt, out=np.zeros(T), where=day_cnt > 0) / 100
+    equity = np.cumprod(1 + daily)
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+    years = np.array([d[:4] for d in panel["dates"]])[entry_idx]
+    by_year = {}
+    for y in np.unique(years):
+        r = returns[years == y]
+        by_year[str(y)] = {"trades": int(len(r)), "hit_rate": round(float((r > 0).mean() * 100), 2), "avg_return": round(float(r.mean()), 3)}
+    return {
+        "trades": int(n),
+        "hit_rate": round(float((returns > 0).mean() * 100), 2),
+        "avg_return": round(float(returns.mean()), 3),
+        "median_return": round(float(np.median(returns)), 3),
+        "total_return": round(float((equity[-1] - 1) * 100), 3),
+        "max_drawdown": round(float(drawdown.min() * 100), 3),
+        "by_year": by_year
+    }
+
+_PANEL = None
+_MASK = None
+
+def _init_worker(panel, mask):
+    global _PANEL, _MASK
+    _PANEL, _MASK = panel, mask
+
+def _sweep_worker(params):
+    return evaluate(_PANEL, params, _MASK)
@@ -0,0 +1,88 @@
+import csv
+import os
+
+class BarStore:
+    """
+    ETF 日线仓库: 每个代码一份 OHLCV 存档 (data/bars/{code}.csv)，只增量合并新 K 线。
+    记录结构与 Harvester 的 K 线上下文一致 (日期/开盘/最高/最低/收盘/成交量/unit)。
+    """
+    FIELDS = ["date", "open", "high", "low", "close", "volume", "unit"]
+    KEYS = ["日期", "开盘", "最高", "最低", "收盘", "成交量", "unit"]
+
+    def __init__(self, bars_dir="data/bars"):
+        self.bars_dir = bars_dir
+        os.makedirs(self.bars_dir, exist_ok=True)
+
+    def path(self, code):
+        return os.path.join(self.bars_dir, f"{code}.csv")
+
+    def load(self, code, limit=None):
+        file_path = self.path(code)
+        if not os.path.exists(file_path):
+            return []
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+        if limit:
+            rows = rows[-limit:]
+        return [self._to_bar(r) for r in rows]
+
+    def load_map(self, codes, limit=None):
+        out = {}
+        for c in codes:
+            bars = self.load(c, limit)
+            if bars: out[c] = bars
+        return out
+
+    def last_date(self, code):
+        """只读取文件末行获取最后日期，不随存档长度增长。"""
+        file_path = self.path(code)
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            if pos == 0: return None
+            f.seek(max(0, pos - 256))
+            lines = f.read().decode('utf-8').strip().splitlines()
+        if not lines: return None
+        last = lines[-1].split(',')[0]
+        return None if last == "date" else last
+
+    def merge(self, code, bars):
+        """
+        合并新抓取的 K 线。日期晚于存档末日的直接追加；与已有日期重叠的 (如盘中未完成的当日 K 线) 以新数据覆盖。
+        返回新增的 K 线数量。
+        """
+        if not bars: return 0
+        bars = sorted(bars, key=lambda b: b["日期"])
+        last = self.last_date(code)
+        file_path = self.path(code)
+
+        if last is None or bars[0]["日期"] > last:
+            new_file = last is None
+            with open(file_path, 'a' if not new_file else 'w', encoding='utf-8', newline='') as f:
+                w = csv.writer(f, lineterminator='\n')
+                if new_file: w.writerow(self.FIELDS)
+                w.writerows(self._to_row(b) for b in bars)
+            return len(bars)
+
+        merged = {b["日期"]: b for b in self.load(code)}
+        before = len(merged)
+        merged.update({b["日期"]: b for b in bars})
+        tmp_path = file_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            w = csv.writer(f, lineterminator='\n')
+            w.writerow(self.FIELDS)
+            w.writerows(self._to_row(merged[d]) for d in sorted(merged))
+        os.replace(tmp_path, file_path)
+        return len(merged) - before
+
+    def _to_row(self, bar):
+        return [bar.get(k, "SHARE" if k == "unit" else None) for k in self.KEYS]
+
+    def _to_bar(self, row):
+        bar = {"日期": row["date"]}
+        for field, key in zip(self.FIELDS[1:6], self.KEYS[1:6]):
+            bar[key] = float(row[field]) if row.get(field) not in (None, "") else None
+        bar["unit"] = row.get("unit") or "SHARE"
+        return bar
@@ -0,0 +1,100 @@
+import glob
+import json
+import os
+import threading
+
+class DashboardData:
+    """
+    看板数据访问层: 按文件 mtime + 大小缓存解析结果，文件未变化时直接返回内存中的对象，不再读盘解析。
+    看板进程内只保留一个实例 (st.cache_resource)，多个会话共享；同一文件的并发首次读取只解析一次。
+    返回的 dict / 数组为共享对象，调用方只读不改。
+    """
+    def __init__(self, base_dir="data"):
+        self.base_dir = base_dir
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def audit_result(self):
+        return self.load_json(os.path.join(self.base_dir, "audit_result.json"))
+
+    def latest_metrics(self):
+        return self.load_json(os.path.join(self.base_dir, "processed", "latest_metrics.json"))
+
+    def load_json(self, path):
+        """文件不存在或解析失败时返回 None。"""
+        return self._cached(path, _read_json)
+
+    def history_keys(self):
+        """data/history 下可用的指标名 (按名称排序)。"""
+        pattern = os.path.join(self.base_dir, "history", "*.csv")
+        return sorted(os.path.splitext(os.path.basename(p))[0] for p in glob.glob(pattern))
+
+    def history_series(self, key):
+        """返回 (timestamps: epoch 秒, values)；复用 IntelEngine 同款的进程内历史缓存 (同样以 mtime 失效)。"""
+        from core.history_store import HISTORY_CACHE
+        return HISTORY_CACHE.get(os.path.join(self.base_dir, "history", f"{key}.csv"))
+
+    def decisions(self, limit=20):
+        """决策存档摘要 (新→旧)，每个存档文件解析一次后按 mtime 缓存。"""
+        paths = sorted(glob.glob(os.path.join(self.base_dir, "audit", "decision_*.json")), reverse=True)
+        rows = []
+        for path in paths[:limit]:
+            summary = self._cached(path, _read_summary)
+            if summary: rows.append(summary)
+        return rows
+
+    def decision(self, timestamp):
+        """单条决策存档全文；timestamp 形如 20260206_1519。"""
+        return self.load_json(os.path.join(self.base_dir, "audit", f"decision_{timestamp}.json"))
+
+    def clear(self):
+        with self._lock: self._entries.clear()
+
+    def _cached(self, path, parse):
+        path = os.path.abspath(path)
+        key = (path, parse)
+        stamp = _stamp(path)
+        if stamp is None:
+            with self._lock: self._entries.pop(key, None)
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == stamp:
+                return entry[1]
+            file_lock = self._locks.setdefault(path, threading.Lock())
+        # 同一文件的首次解析串行化: 后到的会话等待并直接复用结果
+        with file_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry and entry[0] == stamp:
+                return entry[1]
+            value = parse(path)
+            with self._lock:
+                self._entries[key] = (stamp, value)
+            return value
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f: return json.load(f)
+    except: return None
+
+def _read_summary(path):
+    data = _read_json(path)
+    if not isinstance(data, dict):
+        return None
+    timestamp = os.path.basename(path)[len("decision_"):-len(".json")]
+    return {
+        "timestamp": data.get("timestamp", timestamp),
+        "decision": data.get("decision"),
+        "target": data.get("target"),
+        "attack_factor": data.get("attack_factor"),
+        "source": data.get("source", "llm"),
+    }
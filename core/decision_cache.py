@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+import time
+
+class DecisionCache:
+    """
+    审计决策的内容寻址缓存 (data/decision_cache/{digest}.json)。
+    键为规范化后的指标矩阵摘要: 去掉时间戳字段、浮点数按 precision 位取整、键排序后序列化再做 SHA-1。
+    周末 / 夜间行情不变时，相同输入直接复用上一次的决策，不再重复调用模型。
+    """
+    VOLATILE_KEYS = ("timestamp", "last_update")
+
+    def __init__(self, cache_dir="data/decision_cache", ttl=12 * 3600, precision=2):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.precision = precision
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, metrics):
+        raw = json.dumps(self._canonical(metrics), ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """命中且未过期时返回 (决策, 缓存时长秒)，否则返回 None。"""
+        entry = self._read(self._path(key))
+        if not entry:
+            return None
+        age = time.time() - entry.get("created_at", 0)
+        if age > self.ttl:
+            return None
+        return entry["decision"], age
+
+    def put(self, key, decision):
+        now = time.time()
+        entry = {"key": key, "created_at": now, "data_time": decision.get('timestamp'), "decision": decision}
+        path = self._path(key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        self._prune(now)
+
+    def _canonical(self, obj):
+        if isinstance(obj, dict):
+            return {k: self._canonical(v) for k, v in obj.items() if k not in self.VOLATILE_KEYS}
+        if isinstance(obj, list):
+            return [self._canonical(v) for v in obj]
+        if isinstance(obj, float):
+            # -0.0 与 0.0 视为相同输入
+            return round(obj, self.precision) + 0.0
+        return obj
+
+    def _prune(self, now):
+        """清理已过期的条目，避免缓存目录无限增长。"""
+        for f in os.listdir(self.cache_dir):
+            if not f.endswith(".json"): continue
+            path = os.path.join(self.cache_dir, f)
+            entry = self._read(path)
+            if entry is None or now - entry.get("created_at", 0) > self.ttl:
+                os.remove(path)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read(self, path):
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except: return None
@@ -0,0 +1,214 @@
+import json
+import os
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+class RollingState:
+    """
+    单个指标的滚动特征状态。每个新观测值增量更新:
+    - 分位: 每个窗口维护一个有序列表 (二分查找定位)
+    - Z-Score: 窗口内的 Σy / Σy² 滑动和
+    - Slope: 窗口内的 Σy / Σ(i·y) 滑动和，按 OLS 闭式解求斜率
+    """
+    RESYNC_EVERY = 1000
+
+    def __init__(self, pct_windows=(20, 250, 1250), z_window=20, slope_window=5):
+        self.pct_windows = tuple(pct_windows)
+        self.z_window = z_window
+        self.slope_window = slope_window
+        self.maxlen = max(self.pct_windows + (z_window, slope_window))
+        self.buf = deque()
+        self.sorted = {w: [] for w in self.pct_windows}
+        self.count = 0
+        self.last_ts = None
+        self._reset_sums()
+
+    def _reset_sums(self):
+        self.z_sum = self.z_sq = 0.0
+        self.s_sum = self.s_xy = 0.0
+        self._since_resync = 0
+
+    def push(self, value, ts=None):
+        value = float(value)
+        self.buf.append(value)
+        n = len(self.buf)
+
+        for w, arr in self.sorted.items():
+            insort(arr, value)
+            if n > w:
+                del arr[bisect_left(arr, self.buf[-w - 1])]
+
+        self.z_sum += value
+        self.z_sq += value * value
+        if n > self.z_window:
+            old = self.buf[-self.z_window - 1]
+            self.z_sum -= old
+            self.z_sq -= old * old
+
+        w = self.slope_window
+        if n > w:
+            old = self.buf[-w - 1]
+            self.s_xy = self.s_xy - (self.s_sum - old) + (w - 1) * value
+            self.s_sum = self.s_sum - old + value
+        else:
+            self.s_xy += (n - 1) * value
+            self.s_sum += value
+
+        if n > self.maxlen:
+            self.buf.popleft()
+        self.count += 1
+        self.last_ts = ts
+
+        # 滑动和的浮点误差会累积，定期按窗口原值重算
+        self._since_resync += 1
+        if self._since_resync >= self.RESYNC_EVERY:
+            self._resync_sums()
+
+    def _resync_sums(self):
+        self._reset_sums()
+        vals = list(self.buf)
+        z = vals[-self.z_window:]
+        self.z_sum = sum(z)
+        self.z_sq = sum(v * v for v in z)
+        s = vals[-self.slope_window:]
+        self.s_sum = sum(s)
+        self.s_xy = sum(i * v for i, v in enumerate(s))
+
+    def features(self):
+        if not self.buf: return None
+        current = self.buf[-1]
+        out = {"value": current}
+        for w, arr in self.sorted.items():
+            out[f"p_{w}d"] = round(bisect_right(arr, current) / len(arr) * 100, 3)
+        out["z_score"] = self._zscore(current)
+        out["slope"] = self._slope()
+        return out
+
+    def _zscore(self, current):
+        n = min(len(self.buf), self.z_window)
+        if n < 2: return 0.0
+        mean = self.z_sum / n
+        var = self.z_sq / n - mean * mean
+        # 常数序列在浮点下可能残留极小方差，按相对精度视为 0
+        if var <= 1e-12 * max(1.0, mean * mean): return 0.0
+        return round((current - mean) / var ** 0.5, 2)
+
+    def _slope(self):
+        n = min(len(self.buf), self.slope_window)
+        if n < 2: return 0.0
+        sx = n * (n - 1) / 2
+        sxx = (n - 1) * n * (2 * n - 1) / 6
+        return round((n * self.s_xy - sx * self.s_sum) / (n * sxx - sx * sx), 4)
+
+    def to_dict(self):
+        return {"count": self.count, "last_ts": self.last_ts, "buf": list(self.buf)}
+
+    @classmethod
+    def from_dict(cls, d, **kwargs):
+        state = cls(**kwargs)
+        for v in d.get("buf", []):
+            state.push(v)
+        state.count = d.get("count", len(state.buf))
+        state.last_ts = d.get("last_ts")
+        return state
+
+class FeatureEngine:
+    """
+    增量特征引擎: 按指标维护 RollingState，并持久化到 state_file，进程重启后无需从头回放历史。
+    state_file=None 时只在进程内维护，不读写状态文件。
+    """
+    def __init__(self, state_file="data/history/_features.json"):
+        self.state_file = state_file
+        self.states = {}
+        self.dirty = False
+        self._load()
+
+    def sync(self, key, timestamps, values):
+        """
+        将状态推进到历史序列末尾，只回放尚未见过的观测值。
+        若序列与状态不一致 (历史被重写/截断)，以序列末尾 maxlen 个值重建。
+        """
+        n = len(values)
+        state = self.states.get(key)
+        if state is not None and state.count <= n and (state.count == 0 or int(timestamps[state.count - 1]) == state.last_ts):
+            if state.count == n: return state
+            start = state.count
+        else:
+            state = RollingState()
+            start = max(0, n - state.maxlen)
+            state.count = start
+            self.states[key] = state
+        for i in range(start, n):
+            state.push(values[i], int(timestamps[i]))
+        self.dirty = True
+        return state
+
+    def features(self, key, timestamps, values):
+        if len(values) < 1: return None
+        return self.sync(key, timestamps, values).features()
+
+    def save(self):
+        if not self.dirty or not self.state_file: return
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        tmp_path = self.state_file + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({k: s.to_dict() for k, s in self.states.items()}, f)
+        os.replace(tmp_path, self.state_file)
+        self.dirty = False
+
+    def _load(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+            self.states = {k: RollingState.from_dict(d) for k, d in raw.items()}
+        except Exception as e:
+            print(f"⚠️ Feature state corrupted, rebuilding: {e}")
+            self.states = {}
+
+def rolling_feature_series(values, start=0, pct_windows=(20, 250, 1250), z_window=20, slope_window=5, chunk=2048):
+    """
+    对 values[start:] 的每个时点计算与 RollingState 相同口径的特征 (窗口不足时使用已有的全部历史)。
+    序列前端以 NaN 补齐后构造滑动窗口视图，按块向量化计算以控制内存。返回 {特征名: 数组}。
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    out = {"value": values[start:].copy()}
+    if start >= n:
+        return {k: np.empty(0) for k in ["value"] + [f"p_{w}d" for w in pct_windows] + ["z_score", "slope"]}
+
+    def windows(w):
+        padded = np.concatenate([np.full(w - 1, np.nan), values])
+        return sliding_window_view(padded, w)[start:]
+
+    for w in pct_windows:
+        view = windows(w)
+        res = np.empty(n - start)
+        for i in range(0, len(view), chunk):
+            block = view[i:i + chunk]
+            cur = block[:, -1:]
+            cnt = np.count_nonzero(~np.isnan(block), axis=1)
+            res[i:i + chunk] = np.count_nonzero(block <= cur, axis=1) / cnt * 100
+        out[f"p_{w}d"] = np.round(res, 3)
+
+    view = windows(z_window)
+    cnt = np.count_nonzero(~np.isnan(view), axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        std = np.nanstd(view, axis=1)
+        z = (view[:, -1] - np.nanmean(view, axis=1)) / std
+    out["z_score"] = np.where((cnt >= 2) & (std > 0), np.round(z, 2), 0.0)
+
+    view = windows(slope_window)
+    valid = ~np.isnan(view)
+    cnt = valid.sum(axis=1)
+    x = np.where(valid, np.arange(slope_window)[None, :], 0.0)
+    y = np.where(valid, view, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dx = np.where(valid, x - (x.sum(axis=1) / cnt)[:, None], 0.0)
+        dy = np.where(valid, y - (y.sum(axis=1) / cnt)[:, None], 0.0)
+        slope = (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1)
+    out["slope"] = np.where(cnt >= 2, np.round(slope, 4), 0.0)
+    return out
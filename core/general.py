@@ -1,8 +1,12 @@
+import asyncio
 import os
 import json
-from google import genai
-from google.genai import types
 from dotenv import load_dotenv
+from core.rule_engine import RuleEngine
+from core.decision_cache import DecisionCache
+from core.prompt_codec import compact_metrics
+from core.llm_client import LLMClient
+from core.telemetry import TELEMETRY
 
 load_dotenv()
 
@@ -11,15 +15,38 @@ class General:
     模块 C: AI 决策审计中心 - V13 (特征全貌审计)
     基于最新 Gemini 模型，对量化特征矩阵进行深度审计与策略输出。
     """
-    def __init__(self, metrics_file="data/processed/latest_metrics.json", out_dir="data/audit"):
+    def __init__(self, metrics_file="data/processed/latest_metrics.json", out_dir="data/audit", short_circuit=True,
+                 cache_dir="data/decision_cache", cache_ttl=12 * 3600, force_refresh=False,
+                 prompt_top_k=10, llm_deadline=90, llm_timeout=45, max_retries=2, hedge_percentile=None):
         self.metrics_file = metrics_file
         self.out_dir = out_dir
+        # short_circuit: 规则预筛无触发标的时本地输出 WAIT，不调用模型
+        self.short_circuit = short_circuit
+        self.rules = RuleEngine()
+        # 相同指标输入 (去时间戳、取整后) 在 cache_ttl 内复用决策；force_refresh 强制重新调用模型
+        self.cache = DecisionCache(cache_dir, ttl=cache_ttl)
+        self.force_refresh = force_refresh
+        # 提示词中的技术矩阵只保留乖离率最低的 prompt_top_k 个标的 (规则触发标的始终保留)
+        self.prompt_top_k = prompt_top_k
         os.makedirs(self.out_dir, exist_ok=True)
+        from google import genai
         self.client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
         # 官方确认的模型 ID 完整名称为: gemini-3-flash-preview
         self.model_id = os.getenv("GEMINI_MODEL", "gemini-3-flash-preview")
+        # 对冲请求默认关闭；GEMINI_HEDGE_PCT=90 表示单次请求超过历史 P90 延迟时并行补发一条
+        if hedge_percentile is None and os.getenv("GEMINI_HEDGE_PCT"):
+            hedge_percentile = float(os.getenv("GEMINI_HEDGE_PCT"))
+        self.llm = LLMClient(self.client, self.model_id, deadline=llm_deadline, timeout=llm_timeout, max_retries=max_retries,
+                             hedge_percentile=hedge_percentile, latency_file=os.path.join(self.out_dir, "_latency.json"))
+        self._loop = None
 
     def audit(self):
+        # 同一实例复用一个事件循环: 异步客户端的连接绑定在首次使用的循环上，常驻进程多轮调用时保持可用
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(self.audit_async())
+
+    async def audit_async(self):
         if not os.path.exists(self.metrics_file):
             print(f"❌ 错误: 找不到指标文件 {self.metrics_file}")
             return None
@@ -29,6 +56,20 @@ class General:
 
         data_time = metrics.get('timestamp', 'unknown')
 
+        screen = self.rules.screen(metrics)
+        if self.short_circuit and not screen["triggered"]:
+            print(f"🧮 规则预筛: {screen['universe']} 个标的无技术触发，跳过 AI 审计")
+            return self._publish(self.rules.wait_decision(metrics, screen), metrics)
+
+        cache_key = self.cache.key(metrics)
+        cached = None if self.force_refresh else self.cache.get(cache_key)
+        if cached:
+            decision, age = cached
+            print(f"♻️ 决策缓存命中: 指标未变化，复用 {decision.get('timestamp')} 的决策 (缓存 {age / 60:.0f} 分钟)")
+            decision['cache'] = {"hit": True, "key": cache_key, "age_s": round(age), "cached_from": decision.get('timestamp')}
+            return self._publish(decision, metrics)
+
+        data_block, prompt_stats = compact_metrics(metrics, top_k=self.prompt_top_k, priority=[c['code'] for c in screen['triggered']])
         prompt = f"""
 你现在是 Global-Link V13-Cloud 的“首席策略官 (CSO)”。
 你必须遵循“技术面触发 + 宏观面特征验证”的严密逻辑进行审计。
@@ -40,15 +81,19 @@ class General:
 [V14 宏观特征引擎说明]
 现在的 macro_matrix 中，每个指标都包含以下多维特征：
 1. value: 实时数值。
-2. p_20d / p_60d: 该指标在过去 20/60 个采样点的历史分位（0-100）。
+2. p_20d / p_250d / p_1250d: 该指标在过去 20/250/1250 个采样点的历史分位（0-100）。
 3. z_score: 偏离度。
 4. slope: 5日趋势斜率。
 
+[数据格式]
+数据矩阵以紧凑表格给出：每张表首行为列名，之后每行一条记录，字段以 | 分隔，- 表示缺失。
+technical_matrix 仅列出乖离率最低的部分标的（已按乖离率升序）。
+
 [数据健康审计 (Critical)]
-你必须首先检查 macro_health 中的 status 和 last_update：
-- 如果 status 为 FAILED，对应的 macro_matrix 数据可能是过期的。
-- 如果 last_update 与当前数据时间 {data_time} 偏差过大（超过 24 小时或跨交易日），说明该指标采集停滞。
-- 对于过期数据，其 slope 和 z_score 的参考权重必须大幅下调，严禁基于过期数据做出激进决策。
+你必须首先检查 macro_health 与 macro_matrix 的 stale 列：
+- macro_health 只列出异常指标（status 为 FAILED，或 last_update 与当前数据时间 {data_time} 偏差超过 24 小时），未列出的指标均正常。
+- stale=1 的指标数据是过期的，其 change_pct / z_score / slope 已被剔除，仅保留数值与分位供参考。
+- 严禁基于过期数据做出激进决策。
 
 你必须利用这些特征判断宏观环境是在“改善”还是“恶化”，而不仅仅看绝对值。
 
@@ -58,7 +103,7 @@ class General:
 3. 风险控制: 风险敞口系数 (Attack Factor): [0.8, 1.2]。
 
 [数据矩阵]
-{json.dumps(metrics, ensure_ascii=False, indent=2)}
+{data_block}
 
 [审计要求]
 - 必须返回纯 JSON。
@@ -76,32 +121,63 @@ class General:
 }}
 """
         try:
-            response = self.client.models.generate_content(
-                model=self.model_id,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type='application/json',
-                    temperature=0.2,
-                )
-            )
-            
-            res_json = json.loads(response.text)
-            res_json['timestamp'] = data_time
-            res_json['macro_snapshot'] = metrics.get('macro_matrix', {})
-
-            out_path = f"{self.out_dir}/decision_{res_json['timestamp']}.json"
-            with open(out_path, 'w', encoding='utf-8') as f:
-                json.dump(res_json, f, ensure_ascii=False, indent=2)
-                
-            with open("data/audit_result.json", 'w', encoding='utf-8') as f:
-                json.dump(res_json, f, ensure_ascii=False, indent=2)
+            from google.genai import types
+            hedge_after = self.llm.hedge_delay()
+            with TELEMETRY.span("gemini") as sp:
+                try:
+                    response, attempts = await self.llm.generate(
+                        prompt,
+                        config=types.GenerateContentConfig(
+                            response_mime_type='application/json',
+                            temperature=0.2,
+                        )
+                    )
+                except Exception as e:
+                    sp.retries = self.llm.retries(getattr(e, 'attempts', []))
+                    raise
+                sp.retries = self.llm.retries(attempts)
+                sp.bytes = len(response.text or "")
 
-            print(f"⚖️ AI 策略审计完成: {out_path}")
+            res_json = json.loads(response.text)
+            res_json['source'] = "llm"
+            res_json['llm'] = {"model": self.model_id, "attempts": attempts, "hedge_after_s": hedge_after}
+            res_json['prompt'] = self._prompt_usage(prompt, metrics, response, prompt_stats)
+            res_json['cache'] = {"hit": False, "key": cache_key}
+            res_json = self._publish(res_json, metrics)
+            self.cache.put(cache_key, {k: v for k, v in res_json.items() if k != 'cache'})
             return res_json
         except Exception as e:
             print(f"❌ AI 策略审计失败: {e}")
+            for a in getattr(e, 'attempts', []):
+                print(f"   - 第 {a['attempt']} 轮{' (对冲)' if a['hedge'] else ''}: {a.get('latency_ms')} ms, {a.get('outcome')}")
             return None
 
+    def _prompt_usage(self, prompt, metrics, response, prompt_stats):
+        """记录提示词规模: 字符数 (及同一份数据按 indent=2 JSON 编码的字符数作对照) 与模型返回的 token 用量。"""
+        usage = getattr(response, 'usage_metadata', None)
+        return {
+            "chars": len(prompt),
+            "json_chars": len(json.dumps(metrics, ensure_ascii=False, indent=2)),
+            "tokens": getattr(usage, 'prompt_token_count', None),
+            "output_tokens": getattr(usage, 'candidates_token_count', None),
+            **prompt_stats
+        }
+
+    def _publish(self, res_json, metrics):
+        res_json['timestamp'] = metrics.get('timestamp', 'unknown')
+        res_json['macro_snapshot'] = metrics.get('macro_matrix', {})
+
+        out_path = f"{self.out_dir}/decision_{res_json['timestamp']}.json"
+        with open(out_path, 'w', encoding='utf-8') as f:
+            json.dump(res_json, f, ensure_ascii=False, indent=2)
+
+        with open("data/audit_result.json", 'w', encoding='utf-8') as f:
+            json.dump(res_json, f, ensure_ascii=False, indent=2)
+
+        source = res_json.get('source', 'llm') + (" / cache" if res_json.get('cache', {}).get('hit') else "")
+        print(f"⚖️ 策略审计完成 ({source}): {out_path}")
+        return res_json
+
 if __name__ == "__main__":
     general = General()
     general.audit()
@@ -1,67 +1,203 @@
-import akshare as ak
 import json
 import os
 from datetime import datetime, timedelta, date
 import pytz
 import time
-import pandas as pd
 import requests
-import yfinance as yf
+from requests.adapters import HTTPAdapter
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from core.bar_store import BarStore
+from core.response_cache import ResponseCache
+from core.snapshot_archive import SnapshotArchive
+from core.telemetry import TELEMETRY
 
 class Harvester:
-    def __init__(self, data_dir="data/raw"):
+    def __init__(self, data_dir="data/raw", max_workers=8, request_timeout=5, macro_deadline=30, kline_deadline=30, bars_dir="data/bars", bootstrap_bars=120, cache_dir="data/cache", archive_dir="data/archive",
+                 universe=False, universe_file="data/universe/etf_universe.json", universe_ttl_days=7, quote_batch_size=60,
+                 universe_bars_dir="data/universe/bars", prescreen_pct=-1.0, prescreen_limit=60):
         self.data_dir = data_dir
+        # 日线增量仓库: 首次抓取 bootstrap_bars 根，之后只补齐末日之后的 K 线
+        self.bars = BarStore(bars_dir)
+        self.bootstrap_bars = bootstrap_bars
+        # 日频宏观数据 (国债/两融/SHIBOR) 的响应缓存
+        self.cache = ResponseCache(cache_dir)
+        # 全量快照按交易日压缩归档 (审计追溯)
+        self.archive = SnapshotArchive(archive_dir)
+        # K 线并发抓取: 线程池上限 + 套接字超时 (秒)。
+        # request_timeout 作用于每次套接字操作 (建连 / 两次读取之间的间隔)，不限制单个请求的总耗时，
+        # 持续缓慢返回的响应由 kline_deadline (整批 K 线抓取的截止时间) 兜底
+        self.max_workers = max_workers
+        self.request_timeout = request_timeout
+        self.kline_deadline = kline_deadline
+        # 复用连接 (keep-alive): 常驻进程内多轮采集共享同一个会话，连接池容量与并发线程数一致
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(self.max_workers, 10))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # 宏观数据源并发抓取的全局截止时间 (秒)
+        self.macro_deadline = macro_deadline
         os.makedirs(self.data_dir, exist_ok=True)
         self.beijing_tz = pytz.timezone('Asia/Shanghai')
         self.timestamp = datetime.now(self.beijing_tz).strftime("%Y-%m-%d %H:%M")
         self.watchlist = ["159995", "513050", "512760", "512480", "588000", "159915", "510500", "510300", "512660", "512880", "510880", "515080", "512010", "512800", "512690", "159928"]
+        # 实时行情分批请求: 每批代码数量保证 URL 长度安全
+        self.quote_batch_size = quote_batch_size
+        # 全市场模式: 监测池替换为全部上市 ETF (本地缓存的代码表)
+        self.universe_file = universe_file
+        self.universe_ttl_days = universe_ttl_days
+        self.universe = False
+        if universe:
+            codes = self._load_universe()
+            if codes:
+                self.universe = True
+                self.core_codes = set(self.watchlist)
+                self.watchlist = codes
+        # 全市场模式的 K 线只抓核心监测池 + 实时行情预筛出的候选 (当日跌幅 <= prescreen_pct，至多 prescreen_limit 个)；
+        # 候选标的的日线存于 universe_bars_dir (不纳入版本库)
+        self.universe_bars = BarStore(universe_bars_dir) if self.universe else None
+        self.prescreen_pct = prescreen_pct
+        self.prescreen_limit = prescreen_limit
 
-    def harvest_all(self):
-        print(f"🚀 [V13] 开始全量数据抓取 [{self.timestamp}]...")
-        raw_data = {
-            "meta": {"timestamp": self.timestamp, "timezone": "Asia/Shanghai", "version": "V13-Final-Robust"},
-            "etf_spot": self._get_spot(),
-            "macro": self._get_macro(),
-            "hist_data": self._get_hist_context()
-        }
+    def harvest_all(self, macro_only=False):
+        """macro_only: A 股休市时段只采集宏观数据，跳过实时行情与 K 线。"""
+        # 常驻进程中同一实例会被多次调用，每轮重新取采集时刻
+        self.timestamp = datetime.now(self.beijing_tz).strftime("%Y-%m-%d %H:%M")
+        print(f"🚀 [V13] 开始{'宏观' if macro_only else '全量'}数据抓取 [{self.timestamp}]...")
+        self.cache.reset_stats()
+        raw_data = {"meta": {"timestamp": self.timestamp, "timezone": "Asia/Shanghai", "version": "V13-Final-Robust"}}
+        if macro_only:
+            raw_data["meta"]["mode"] = "macro_only"
+        with TELEMETRY.span("harvest.spot", kind="stage"):
+            raw_data["etf_spot"] = [] if macro_only else self._get_spot()
+        with TELEMETRY.span("harvest.macro", kind="stage"):
+            raw_data["macro"] = self._get_macro()
+        with TELEMETRY.span("harvest.hist", kind="stage"):
+            raw_data["hist_delta"] = {} if macro_only else self._get_hist_context(raw_data["etf_spot"])
+        # 本轮成功抓取 K 线的代码: 全市场候选的日线只对这些代码有效 (见 QuantLab._load_hist)
+        raw_data["meta"]["kline_codes"] = sorted(raw_data["hist_delta"])
+        raw_data["meta"]["cache"] = self.cache.stats()
         raw_data = self._serialize_clean(raw_data)
         with open(f"{self.data_dir}/latest_snap.json", 'w', encoding='utf-8') as f:
             json.dump(raw_data, f, ensure_ascii=False, indent=2)
+        self.archive.append(raw_data)
         return raw_data
 
     def _serialize_clean(self, obj):
         if isinstance(obj, dict): return {k: self._serialize_clean(v) for k, v in obj.items()}
         elif isinstance(obj, list): return [self._serialize_clean(i) for i in obj]
-        elif pd.isna(obj): return None
+        # NaN (含 numpy 浮点) 序列化为 null
+        elif isinstance(obj, float) and obj != obj: return None
         return obj
 
+    def _load_universe(self):
+        """全市场 ETF 代码表: 优先读取本地缓存，过期 (universe_ttl_days) 后经 AkShare 刷新；刷新失败时沿用旧表。"""
+        cached = None
+        if os.path.exists(self.universe_file):
+            try:
+                with open(self.universe_file, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+                updated = datetime.strptime(cached["updated"], "%Y-%m-%d").date()
+                if (datetime.now(self.beijing_tz).date() - updated).days < self.universe_ttl_days:
+                    return cached["codes"]
+            except Exception as e:
+                print(f"⚠️ Universe cache unreadable: {e}")
+        try:
+            import akshare as ak
+            with TELEMETRY.span("akshare.fund_etf_spot_em"):
+                df = ak.fund_etf_spot_em()
+            codes = sorted(set(df['代码'].astype(str).str.zfill(6)))
+            if codes:
+                os.makedirs(os.path.dirname(self.universe_file) or ".", exist_ok=True)
+                with open(self.universe_file, 'w', encoding='utf-8') as f:
+                    json.dump({"updated": datetime.now(self.beijing_tz).strftime("%Y-%m-%d"), "codes": codes}, f, ensure_ascii=False)
+                print(f"🌐 ETF Universe refreshed: {len(codes)} codes")
+                return codes
+        except Exception as e:
+            print(f"⚠️ Universe refresh failed: {e}")
+        return cached["codes"] if cached else None
+
     def _get_spot(self):
+        """实时行情: 代码按 quote_batch_size 分批，各批并发请求后按原顺序合并。"""
+        symbols = [f"s_sh{c}" if c.startswith(('5', '6')) else f"s_sz{c}" for c in self.watchlist]
+        batches = [symbols[i:i + self.quote_batch_size] for i in range(0, len(symbols), self.quote_batch_size)]
+        if not batches: return []
+        workers = max(1, min(self.max_workers, len(batches)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return [row for rows in pool.map(self._fetch_spot_batch, batches) for row in rows]
+
+    def _fetch_spot_batch(self, symbols):
         try:
-            symbols = [f"sh{c}" if c.startswith(('5', '6')) else f"sz{c}" for c in self.watchlist]
             # 添加 Headers 避免被屏蔽
             headers = {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
                 "Referer": "https://finance.sina.com.cn"
             }
-            r = requests.get(f"http://qt.gtimg.cn/q=s_{','.join(symbols)}", headers=headers, timeout=5)
+            with TELEMETRY.span("tencent.quotes") as sp:
+                r = self.session.get(f"http://qt.gtimg.cn/q={','.join(symbols)}", headers=headers, timeout=self.request_timeout)
+                sp.bytes = len(r.content)
+                if r.status_code != 200: sp.outcome = f"http_{r.status_code}"
             if r.status_code == 200:
                 results = []
                 for p in r.text.strip().split(';'):
                     if '~' not in p: continue
                     parts = p.split('~')
-                    results.append({
-                        "代码": parts[2], "名称": parts[1], "最新价": float(parts[3]),
-                        "成交量": float(parts[6]), "涨跌幅": float(parts[5]), "unit": "LOT"
-                    })
+                    try:
+                        results.append({
+                            "代码": parts[2], "名称": parts[1], "最新价": float(parts[3]),
+                            "成交量": float(parts[6]), "涨跌幅": float(parts[5]), "unit": "LOT"
+                        })
+                    except (IndexError, ValueError): continue
                 return results
-        except: pass
+        except Exception as e:
+            print(f"⚠️ Spot batch failed ({len(symbols)} codes): {e}")
         return []
 
+    def _wrap(self, data):
+        return {**(data if isinstance(data, dict) else {"value": data}), "status": "SUCCESS" if data is not None else "FAILED", "last_update": self.timestamp}
+
     def _get_macro(self):
+        """各宏观数据源分组并发抓取，超过 macro_deadline 未返回的分组标记为 FAILED。"""
+        # (分组名, 抓取函数, 该分组负责的指标)
+        groups = [
+            ("sina", self._macro_sina, ["CNH", "Nasdaq", "HangSeng", "A50_Futures", "VIX", "Gold", "CrudeOil", "CSI300_Vol"]),
+            ("rates", self._macro_rates, ["CN10Y", "US10Y"]),
+            ("southbound", self._macro_southbound, ["Southbound"]),
+            ("margin", self._macro_margin, ["Margin_Debt"]),
+            ("shibor", self._macro_shibor, ["SHIBOR"]),
+        ]
+        results = {}
+        def run(name, fn):
+            try:
+                results[name] = fn()
+            except Exception as e:
+                print(f"⚠️ Macro group {name} Error: {e}")
+                results[name] = {}
+
+        # 守护线程: 超时的数据源不会阻塞本轮流程，也不会拖住进程退出
+        threads = [(name, threading.Thread(target=run, args=(name, fn), daemon=True)) for name, fn, _ in groups]
+        for _, t in threads: t.start()
+        deadline = time.monotonic() + self.macro_deadline
+        for _, t in threads:
+            t.join(max(0, deadline - time.monotonic()))
+        done = dict(results)
+
         macro = {}
-        def wrap(data): return {**(data if isinstance(data, dict) else {"value": data}), "status": "SUCCESS" if data is not None else "FAILED", "last_update": self.timestamp}
+        for name, _, keys in groups:
+            if name not in done:
+                print(f"⏱️ Macro group {name} timed out after {self.macro_deadline}s")
+                for k in keys:
+                    macro[k] = {**self._wrap(None), "reason": f"timeout: {name} > {self.macro_deadline}s"}
+                continue
+            macro.update(done[name])
 
+        print(f"📡 Macro Keys Captured: {[k for k, v in macro.items() if v.get('status') == 'SUCCESS']}")
+        return macro
+
+    def _macro_sina(self):
         # 1. 全球宏观 + 国内核心指数 (Sina Global & Domestic)
+        macro = {}
+        wrap = self._wrap
         sina_map = {
             "CNH": "fx_susdcnh", 
             "Nasdaq": "gb_ndx", 
@@ -78,7 +214,9 @@ class Harvester:
                 "Referer": "https://finance.sina.com.cn",
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
             }
-            r = requests.get(url, headers=headers, timeout=5)
+            with TELEMETRY.span("sina.macro") as sp:
+                r = self.session.get(url, headers=headers, timeout=self.request_timeout)
+                sp.bytes = len(r.content)
             lines = r.text.strip().split('\n')
             inv_map = {v: k for k, v in sina_map.items()}
             for line in lines:
@@ -122,29 +260,45 @@ class Harvester:
                     print(f"❌ Error parsing Sina {sym}: {e}")
         except Exception as e:
             print(f"❌ Sina Request Failed: {e}")
+        return macro
 
+    def _macro_rates(self):
         # 2. 国债收益率 (CN & US)
+        macro = {}
+        wrap = self._wrap
         try:
-            df_rates = ak.bond_zh_us_rate()
+            import akshare as ak
+            # 日频数据: 收盘后更新，缓存至当日 18:00
+            df_rates = self.cache.fetch("bond_zh_us_rate", ak.bond_zh_us_rate, publish_at="18:00", keep_tail=30)
             if not df_rates.empty:
                 cn_latest = df_rates.dropna(subset=['中国国债收益率10年']).iloc[-1]
                 macro['CN10Y'] = wrap({"yield": float(cn_latest['中国国债收益率10年'])})
                 us_latest = df_rates.dropna(subset=['美国国债收益率10年']).iloc[-1]
                 macro['US10Y'] = wrap({"price": float(us_latest['美国国债收益率10年'])})
         except: pass
+        return macro
 
+    def _macro_southbound(self):
         # 3. 跨境资金 (由于新规隐藏北向实时净流入，此处取南向净流入作为对冲情绪参考)
+        macro = {}
         try:
-            df = ak.stock_hsgt_fund_flow_summary_em()
+            import akshare as ak
+            with TELEMETRY.span("akshare.stock_hsgt_fund_flow_summary_em"):
+                df = ak.stock_hsgt_fund_flow_summary_em()
             south = df[df['资金方向'] == '南向']
             val = south['成交净买额'].astype(float).sum() * 1e8
-            macro['Southbound'] = wrap({"value": val, "note": "Northbound hidden; using Southbound as proxy"})
+            macro['Southbound'] = self._wrap({"value": val, "note": "Northbound hidden; using Southbound as proxy"})
         except: pass
+        return macro
 
+    def _macro_margin(self):
         # 5. 两融 (AkShare 宏观两融接口)
+        macro = {}
         try:
-            m_sh = ak.macro_china_market_margin_sh()
-            m_sz = ak.macro_china_market_margin_sz()
+            import akshare as ak
+            # T 日两融余额于 T+1 开盘前发布
+            m_sh = self.cache.fetch("margin_sh", ak.macro_china_market_margin_sh, publish_at="09:10", keep_tail=10)
+            m_sz = self.cache.fetch("margin_sz", ak.macro_china_market_margin_sz, publish_at="09:10", keep_tail=10)
             if not m_sh.empty and not m_sz.empty:
                 def get_total(df, idx):
                     col = '融资融券余额' if '融资融券余额' in df.columns else df.columns[-1]
@@ -152,41 +306,104 @@ class Harvester:
                 latest_total = get_total(m_sh, -1) + get_total(m_sz, -1)
                 prev_total = get_total(m_sh, -2) + get_total(m_sz, -2)
                 change_pct = (latest_total / prev_total - 1) * 100 if prev_total != 0 else None
-                macro['Margin_Debt'] = wrap({"value": latest_total, "change_pct": change_pct})
+                macro['Margin_Debt'] = self._wrap({"value": latest_total, "change_pct": change_pct})
         except: pass
+        return macro
 
+    def _macro_shibor(self):
         # 6. 国内流动性 (SHIBOR)
+        macro = {}
         try:
-            shibor = ak.rate_interbank(market="上海银行同业拆借市场", symbol="Shibor人民币", indicator="隔夜")
+            import akshare as ak
+            # SHIBOR 每个工作日 11:00 发布
+            shibor = self.cache.fetch("rate_interbank", ak.rate_interbank, market="上海银行同业拆借市场", symbol="Shibor人民币", indicator="隔夜", publish_at="11:05", keep_tail=10)
             if not shibor.empty:
-                macro['SHIBOR'] = wrap({"value": float(shibor.iloc[-1]['利率'])})
+                macro['SHIBOR'] = self._wrap({"value": float(shibor.iloc[-1]['利率'])})
                 print(f"✅ SHIBOR Captured: {macro['SHIBOR']['value']}%")
         except Exception as e:
             print(f"⚠️ SHIBOR Error: {e}")
-
-        print(f"📡 Macro Keys Captured: {list(macro.keys())}")
         return macro
 
-    def _get_hist_context(self):
+    def _get_hist_context(self, spot=()):
+        """
+        并发增量抓取 K 线并合并进 BarStore，返回本轮新抓取的 {代码: [K 线记录]}。
+        超过 kline_deadline 仍未返回的代码本轮放弃 (沿用存档)，迟到的结果不再写入 BarStore。
+        """
         ctx = {}
-        for c in self.watchlist:
-            try:
-                # 使用新浪 K 线接口，比 AkShare 更稳定
-                prefix = "sh" if c.startswith(('5', '6')) else "sz"
-                url = f"http://money.finance.sina.com.cn/quotes_service/api/json_v2.php/CN_MarketData.getKLineData?symbol={prefix}{c}&scale=240&ma=no&datalen=45"
-                r = requests.get(url, timeout=5).json()
-                if r:
-                    ctx[c] = [{
-                        "日期": item['day'],
-                        "开盘": float(item['open']),
-                        "最高": float(item['high']),
-                        "最低": float(item['low']),
-                        "收盘": float(item['close']),
-                        "成交量": float(item['volume']),
-                        "unit": "SHARE"
-                    } for item in r]
-            except: pass
+        codes = self._kline_codes(spot)
+        if not codes: return ctx
+        workers = max(1, min(self.max_workers, len(codes)))
+        pool = ThreadPoolExecutor(max_workers=workers)
+        futures = [pool.submit(self._fetch_kline, c) for c in codes]
+        done, pending = wait(futures, timeout=self.kline_deadline)
+        # 不等待仍在进行的请求: 未开始的直接取消，进行中的由套接字超时自然结束
+        pool.shutdown(wait=False, cancel_futures=True)
+        for c, fut in zip(codes, futures):
+            bars = fut.result() if fut in done else None
+            if bars:
+                self._store(c).merge(c, bars)
+                ctx[c] = bars
+        if pending:
+            print(f"⏱️ K-line fetch timed out after {self.kline_deadline}s: {len(pending)}/{len(codes)} codes skipped")
         return ctx
 
+    def _kline_codes(self, spot):
+        """需要抓取 K 线的代码: 常规模式为整个监测池；全市场模式为核心监测池 + 预筛候选，不逐个请求全部 ETF。"""
+        if not self.universe:
+            return list(self.watchlist)
+        movers = []
+        for s in spot:
+            c = s.get('代码')
+            if not c or c in self.core_codes: continue
+            try:
+                pct = float(s.get('涨跌幅'))
+            except (TypeError, ValueError):
+                continue
+            if pct <= self.prescreen_pct:
+                movers.append((pct, c))
+        candidates = [c for _, c in sorted(movers)[:self.prescreen_limit]]
+        print(f"🔎 全市场预筛: {len(spot)} 个标的中 {len(movers)} 个跌幅 <= {self.prescreen_pct}%，抓取 K 线 {len(candidates)} 个")
+        return sorted(self.core_codes) + candidates
+
+    def _store(self, code):
+        return self.universe_bars if self.universe and code not in self.core_codes else self.bars
+
+    def _kline_datalen(self, last_date):
+        """根据存档末日估算需补齐的 K 线数量 (含末日本身，用于刷新盘中未完成的 K 线)。"""
+        if not last_date: return self.bootstrap_bars
+        try:
+            last = datetime.strptime(last_date[:10], "%Y-%m-%d").date()
+        except ValueError:
+            return self.bootstrap_bars
+        today = datetime.now(self.beijing_tz).date()
+        days = (today - last).days
+        if days > self.bootstrap_bars * 2: return self.bootstrap_bars
+        weekdays = sum(1 for i in range(1, days + 1) if (last + timedelta(days=i)).weekday() < 5)
+        return max(2, min(self.bootstrap_bars, weekdays + 1))
+
+    def _fetch_kline(self, c):
+        try:
+            last_date = self._store(c).last_date(c)
+            datalen = self._kline_datalen(last_date)
+            # 使用新浪 K 线接口，比 AkShare 更稳定
+            prefix = "sh" if c.startswith(('5', '6')) else "sz"
+            url = f"http://money.finance.sina.com.cn/quotes_service/api/json_v2.php/CN_MarketData.getKLineData?symbol={prefix}{c}&scale=240&ma=no&datalen={datalen}"
+            with TELEMETRY.span("sina.kline") as sp:
+                resp = self.session.get(url, timeout=self.request_timeout)
+                sp.bytes = len(resp.content)
+                r = resp.json()
+            if r:
+                return [{
+                    "日期": item['day'],
+                    "开盘": float(item['open']),
+                    "最高": float(item['high']),
+                    "最低": float(item['low']),
+                    "收盘": float(item['close']),
+                    "成交量": float(item['volume']),
+                    "unit": "SHARE"
+                } for item in r if not last_date or item['day'] >= last_date]
+        except: pass
+        return None
+
 if __name__ == "__main__":
     Harvester().harvest_all()
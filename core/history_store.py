@@ -0,0 +1,227 @@
+import json
+import os
+import threading
+import numpy as np
+
+def to_epoch_seconds(timestamps):
+    """
+    时间戳字符串 -> int64 epoch 秒 (按北京时间的挂钟时间直接编码，不做时区换算)。
+    兼容标准格式 "YYYY-MM-DD HH:MM" 与早期快照遗留的 "YYYYMMDD_HHMM"。
+    """
+    import pandas as pd
+    raw = pd.Series(timestamps, dtype=str)
+    ts = pd.to_datetime(raw, format="%Y-%m-%d %H:%M", errors="coerce")
+    legacy = ts.isna()
+    if legacy.any():
+        ts[legacy] = pd.to_datetime(raw[legacy], format="%Y%m%d_%H%M", errors="coerce")
+    return ts.to_numpy().astype("datetime64[s]").astype(np.int64)
+
+def binary_paths(csv_path):
+    """CSV 存档对应的二进制列存文件: {key}.ts.npy (int64 epoch 秒) 与 {key}.val.npy (float64)。"""
+    base = csv_path[:-4] if csv_path.endswith(".csv") else csv_path
+    return base + ".ts.npy", base + ".val.npy"
+
+def write_binary(csv_path):
+    """由 CSV 存档生成二进制列存文件 (整体重写)，返回行数。"""
+    import pandas as pd
+    df = pd.read_csv(csv_path)
+    ts_path, val_path = binary_paths(csv_path)
+    _save_npy(ts_path, to_epoch_seconds(df["timestamp"]))
+    _save_npy(val_path, df["value"].astype(float).to_numpy())
+    return len(df)
+
+def append_binary(csv_path, timestamp, value):
+    """向二进制列存追加一行: 原地改写 .npy 头部的 shape 并在文件末尾写入数据，无需重写整个数组。"""
+    ts_path, val_path = binary_paths(csv_path)
+    _npy_append(ts_path, to_epoch_seconds([timestamp]))
+    _npy_append(val_path, np.array([float(value)]))
+
+def _save_npy(path, arr):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, arr)
+    os.replace(tmp_path, path)
+
+def _npy_append(path, arr):
+    with open(path, 'r+b') as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            len_size = 2
+        else:
+            shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            len_size = 4
+        data_start = f.tell()
+        header_len = data_start - 8 - len_size
+        header = repr({'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (shape[0] + len(arr),)})
+        if fortran or len(shape) != 1 or len(header) + 1 > header_len:
+            # 头部预留空间不足 (极少见)，退回整体重写
+            f.close()
+            _save_npy(path, np.concatenate([np.load(path), arr.astype(dtype)]))
+            return
+        f.seek(8 + len_size)
+        f.write((header + ' ' * (header_len - len(header) - 1) + '\n').encode('latin1'))
+        f.seek(0, os.SEEK_END)
+        f.write(arr.astype(dtype).tobytes())
+
+class HistoryCache:
+    """
+    进程内历史序列缓存: 每个文件保存为 (timestamps: int64 epoch 秒, values: float64) 两个 NumPy 数组。
+    二进制列存 (.npy) 存在且不旧于 CSV 时以内存映射方式读取，否则解析 CSV。
+    以文件 mtime + 大小作为失效依据；同一进程内的 IntelEngine / 看板共享同一份 (见 HISTORY_CACHE)。
+    """
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def stamp(self, file_path):
+        """返回 (数据源, 版本戳)；数据源为 "npy" / "csv"，文件不存在时为 (None, None)。"""
+        try:
+            csv_st = os.stat(file_path)
+        except FileNotFoundError:
+            csv_st = None
+        ts_path, val_path = binary_paths(file_path)
+        try:
+            ts_st, val_st = os.stat(ts_path), os.stat(val_path)
+            if csv_st is None or min(ts_st.st_mtime_ns, val_st.st_mtime_ns) >= csv_st.st_mtime_ns:
+                return "npy", (val_st.st_mtime_ns, val_st.st_size, ts_st.st_mtime_ns, ts_st.st_size)
+        except FileNotFoundError:
+            pass
+        if csv_st is None:
+            return None, None
+        return "csv", (csv_st.st_mtime_ns, csv_st.st_size)
+
+    def get(self, file_path):
+        """返回 (timestamps, values)；文件不存在时返回 None。未变化的文件不会重复解析。"""
+        file_path = os.path.abspath(file_path)
+        source, stamp = self.stamp(file_path)
+        if source is None:
+            with self._lock: self._entries.pop(file_path, None)
+            return None
+        with self._lock:
+            entry = self._entries.get(file_path)
+        if entry and entry[0] == stamp:
+            return entry[1], entry[2]
+
+        if source == "npy":
+            ts_path, val_path = binary_paths(file_path)
+            ts = np.load(ts_path, mmap_mode='r')
+            values = np.load(val_path, mmap_mode='r')
+        else:
+            import pandas as pd
+            df = pd.read_csv(file_path)
+            ts = to_epoch_seconds(df["timestamp"])
+            values = df["value"].astype(float).to_numpy()
+        with self._lock:
+            self._entries[file_path] = (stamp, ts, values)
+        return ts, values
+
+    def extend(self, file_path, prev_stamp, timestamp, value):
+        """追加写入后同步缓存: 仅当缓存对应的是追加前的文件版本时原地扩展，否则丢弃，下次读取时重新解析。"""
+        file_path = os.path.abspath(file_path)
+        _, stamp = self.stamp(file_path)
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if not entry: return
+            if entry[0] != prev_stamp:
+                self._entries.pop(file_path, None)
+                return
+            ts = np.append(entry[1], to_epoch_seconds([timestamp]))
+            values = np.append(entry[2], float(value))
+            self._entries[file_path] = (stamp, ts, values)
+
+    def clear(self):
+        with self._lock: self._entries.clear()
+
+HISTORY_CACHE = HistoryCache()
+
+class HistoryStore:
+    """
+    宏观历史存档 (data/history/{key}.csv) 的追加写入层。
+    尾部索引 _tail.json 记录每个文件的末行时间戳与字节数，去重判断与追加均为 O(1)，不随存档长度增长。
+    """
+    INDEX_FILE = "_tail.json"
+
+    def __init__(self, history_dir="data/history", cache=HISTORY_CACHE):
+        self.history_dir = history_dir
+        self.cache = cache
+        os.makedirs(self.history_dir, exist_ok=True)
+        self.index_path = os.path.join(self.history_dir, self.INDEX_FILE)
+        self._index = self._load_index()
+
+    def path(self, key):
+        return os.path.join(self.history_dir, f"{key}.csv")
+
+    def last_timestamp(self, key):
+        entry = self._tail(key)
+        return entry["timestamp"] if entry else None
+
+    def append_many(self, rows):
+        """
+        批量追加: rows = {key: (timestamp, value)}。与末行时间戳相同的记录跳过。
+        返回实际写入的 key 列表。索引在整批写完后只落盘一次。
+        """
+        written = []
+        for key, (timestamp, value) in rows.items():
+            entry = self._tail(key)
+            if entry and entry["timestamp"] == str(timestamp):
+                continue
+            file_path = self.path(key)
+            prev_source, prev_stamp = self.cache.stamp(os.path.abspath(file_path))
+            with open(file_path, 'a', encoding='utf-8', newline='') as f:
+                if entry is None and f.tell() == 0:
+                    f.write("timestamp,value\n")
+                elif entry is not None and not entry.get("eol", True):
+                    f.write("\n")
+                f.write(f"{timestamp},{value}\n")
+            # 二进制列存与 CSV 同步时一并追加，否则保持原状 (读取时自动回退到较新的 CSV)
+            if prev_source == "npy":
+                append_binary(file_path, timestamp, value)
+            self._index[key] = {"timestamp": str(timestamp), "size": os.path.getsize(file_path), "eol": True}
+            if prev_source is not None:
+                self.cache.extend(file_path, prev_stamp, timestamp, value)
+            written.append(key)
+        if written:
+            self._save_index()
+        return written
+
+    def _tail(self, key):
+        """优先使用索引；文件被外部改写 (大小不一致) 时回退为 seek 读取末行。"""
+        file_path = self.path(key)
+        if not os.path.exists(file_path):
+            self._index.pop(key, None)
+            return None
+        size = os.path.getsize(file_path)
+        entry = self._index.get(key)
+        if entry and entry.get("size") == size:
+            return entry
+        entry = self._read_tail(file_path, size)
+        if entry: self._index[key] = entry
+        else: self._index.pop(key, None)
+        return entry
+
+    def _read_tail(self, file_path, size):
+        if size == 0: return None
+        with open(file_path, 'rb') as f:
+            f.seek(max(0, size - 512))
+            chunk = f.read()
+        lines = chunk.decode('utf-8', errors='ignore').splitlines()
+        lines = [l for l in lines if l.strip()]
+        if not lines: return None
+        ts = lines[-1].split(',')[0].strip()
+        if ts == "timestamp": return None
+        return {"timestamp": ts, "size": size, "eol": chunk.endswith(b"\n")}
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except: return {}
+
+    def _save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
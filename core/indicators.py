@@ -0,0 +1,183 @@
+import json
+import os
+from collections import deque
+
+class IndicatorState:
+    """
+    单个标的的技术指标递推状态。每根新 K 线 O(1) 更新:
+    - MACD: EMA12 / EMA26 / DEA9 指数递推
+    - RSI14 / ATR14: Wilder 平滑 (前 N 根以简单均值起算)
+    - 均线 / 布林带: 收盘价窗口的滑动和 (及平方和)
+    """
+    MA_WINDOWS = (10, 20, 60)
+    BOLL_WINDOW = 20
+    RSI_N = 14
+    ATR_N = 14
+    # 实时均线以 (最近 w-1 根收盘 + 现价) / w 计算，与 MA5 乖离口径一致
+    SUM_WINDOWS = tuple(sorted({w - 1 for w in MA_WINDOWS} | {BOLL_WINDOW}))
+    # 滑动和每隔 RESYNC_EVERY 根 K 线按窗口原值重算一次 (约一年日线)
+    RESYNC_EVERY = 250
+
+    def __init__(self):
+        self.last_date = None
+        self.count = 0
+        self.prev_close = None
+        self.ema12 = self.ema26 = self.dea = None
+        self.avg_gain = self.avg_loss = 0.0
+        self.atr = 0.0
+        self.closes = deque()
+        self.sums = {w: 0.0 for w in self.SUM_WINDOWS}
+        self.boll_sq = 0.0
+        self._since_resync = 0
+
+    def update(self, bar):
+        close, high, low = bar["收盘"], bar.get("最高"), bar.get("最低")
+        high = close if high is None else high
+        low = close if low is None else low
+        self.count += 1
+
+        # MACD
+        if self.ema12 is None:
+            self.ema12 = self.ema26 = close
+            self.dea = 0.0
+        else:
+            self.ema12 += (close - self.ema12) * 2 / 13
+            self.ema26 += (close - self.ema26) * 2 / 27
+            self.dea += ((self.ema12 - self.ema26) - self.dea) * 2 / 10
+
+        # RSI / ATR (Wilder)
+        if self.prev_close is None:
+            tr = high - low
+        else:
+            change = close - self.prev_close
+            self._wilder("avg_gain", max(change, 0.0), self.RSI_N, self.count - 1)
+            self._wilder("avg_loss", max(-change, 0.0), self.RSI_N, self.count - 1)
+            tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self._wilder("atr", tr, self.ATR_N, self.count)
+        self.prev_close = close
+
+        # 均线 / 布林带滑动和
+        self.closes.append(close)
+        n = len(self.closes)
+        for w in self.SUM_WINDOWS:
+            self.sums[w] += close
+            if n > w: self.sums[w] -= self.closes[-w - 1]
+        self.boll_sq += close * close
+        if n > self.BOLL_WINDOW:
+            old = self.closes[-self.BOLL_WINDOW - 1]
+            self.boll_sq -= old * old
+        if n > max(self.SUM_WINDOWS):
+            self.closes.popleft()
+        self.last_date = bar["日期"]
+
+        # 滑动和的浮点误差会累积，定期按窗口原值重算
+        self._since_resync += 1
+        if self._since_resync >= self.RESYNC_EVERY:
+            self._resync_sums()
+
+    def _resync_sums(self):
+        vals = list(self.closes)
+        self.sums = {w: sum(vals[-w:]) for w in self.SUM_WINDOWS}
+        self.boll_sq = sum(v * v for v in vals[-self.BOLL_WINDOW:])
+        self._since_resync = 0
+
+    def _wilder(self, attr, value, period, k):
+        # 第 k 个样本: k <= period 时为简单均值，之后按 (prev * (period - 1) + value) / period 平滑
+        prev = getattr(self, attr)
+        setattr(self, attr, prev + (value - prev) / k if k <= period else (prev * (period - 1) + value) / period)
+
+    def snapshot(self, price):
+        """以现价 price 输出指标列 (历史不足的指标为 None)。"""
+        out = {}
+        n = len(self.closes)
+        for w in self.MA_WINDOWS:
+            ma = (self.sums[w - 1] + price) / w if n >= w - 1 else None
+            out[f"bias_ma{w}"] = round((price / ma - 1) * 100, 2) if ma else None
+
+        if self.count > self.RSI_N:
+            total = self.avg_gain + self.avg_loss
+            out["rsi14"] = round(self.avg_gain / total * 100, 2) if total > 0 else 50.0
+        else:
+            out["rsi14"] = None
+
+        out["atr_pct"] = round(self.atr / price * 100, 2) if self.count >= self.ATR_N and price else None
+
+        w = self.BOLL_WINDOW
+        if n >= w:
+            mean = self.sums[w] / w
+            std = max(self.boll_sq / w - mean * mean, 0.0) ** 0.5
+            out["boll_pb"] = round((price - (mean - 2 * std)) / (4 * std), 2) if std > 0 else None
+        else:
+            out["boll_pb"] = None
+
+        if self.ema12 is not None:
+            dif = self.ema12 - self.ema26
+            out["macd_dif"] = round(dif, 4)
+            out["macd_dea"] = round(self.dea, 4)
+            out["macd_hist"] = round(2 * (dif - self.dea), 4)
+        else:
+            out["macd_dif"] = out["macd_dea"] = out["macd_hist"] = None
+        return out
+
+    def to_dict(self):
+        d = {k: v for k, v in self.__dict__.items() if k not in ("closes", "sums")}
+        d["closes"] = list(self.closes)
+        d["sums"] = {str(k): v for k, v in self.sums.items()}
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        state = cls()
+        for k, v in d.items():
+            if k == "closes": state.closes = deque(v)
+            elif k == "sums": state.sums = {int(w): s for w, s in v.items()}
+            else: setattr(state, k, v)
+        return state
+
+class IndicatorEngine:
+    """
+    按标的维护 IndicatorState 并持久化 (data/bars/_indicators.json)，每轮只回放 BarStore 中的新 K 线。
+    仅已完结的 K 线 (日期早于当日) 进入递推状态；当日盘中 K 线可能被修订，其影响通过现价体现。
+    """
+    def __init__(self, state_file="data/bars/_indicators.json"):
+        self.state_file = state_file
+        self.states = {}
+        self.dirty = False
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    self.states = {c: IndicatorState.from_dict(d) for c, d in json.load(f).items()}
+            except Exception as e:
+                print(f"⚠️ Indicator state corrupted, rebuilding: {e}")
+
+    def sync(self, code, bars, as_of):
+        state = self.states.get(code)
+        dates = [b["日期"] for b in bars]
+        # 存档被改写 (末次递推的 K 线已不存在) 时从头重建
+        if state is None or (state.last_date is not None and state.last_date not in dates):
+            state = IndicatorState()
+            self.states[code] = state
+        for b in bars:
+            if b.get("收盘") is None: continue
+            if state.last_date is not None and b["日期"] <= state.last_date: continue
+            if b["日期"][:10] >= as_of: break
+            state.update(b)
+            self.dirty = True
+        return state
+
+    def enrich(self, matrix, hist_map, as_of):
+        """为技术矩阵的每一行追加指标列。as_of 为当日日期 (YYYY-MM-DD)。"""
+        for row in matrix:
+            bars = hist_map.get(row["code"])
+            if not bars: continue
+            row.update(self.sync(row["code"], bars, as_of).snapshot(row["price"]))
+        return matrix
+
+    def save(self):
+        if not self.dirty: return
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        tmp_path = self.state_file + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({c: s.to_dict() for c, s in self.states.items()}, f)
+        os.replace(tmp_path, self.state_file)
+        self.dirty = False
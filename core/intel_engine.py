@@ -1,20 +1,27 @@
 import os
-import pandas as pd
 import numpy as np
 from datetime import datetime
+from core.history_store import HistoryStore, to_epoch_seconds, write_binary
+from core.feature_engine import FeatureEngine, rolling_feature_series
 
 class IntelEngine:
-    def __init__(self, history_dir="data/history"):
+    def __init__(self, history_dir="data/history", features_dir="data/features"):
         self.history_dir = history_dir
+        self.features_dir = features_dir
         os.makedirs(self.history_dir, exist_ok=True)
+        self.store = HistoryStore(history_dir)
+        # 单指标增量特征状态 (分位/偏离度/斜率)，仅 get_features 使用，首次查询时创建；运行链路使用 get_feature_matrix
+        self._features = None
 
     def update_history(self, raw_macro):
         """
         持久化存储宏观信号历史（CSV格式）。
+        整轮数据一次性批量追加，去重依赖 HistoryStore 的尾部索引，无需重新读取历史文件。
         """
         timestamp = raw_macro.get("meta", {}).get("timestamp", datetime.now().strftime("%Y-%m-%d %H:%M"))
         macro_data = raw_macro.get("macro", {})
         
+        rows = {}
         for key, info in macro_data.items():
             if info.get("status") != "SUCCESS":
                 continue
@@ -34,69 +41,132 @@ class IntelEngine:
             if key in ['Southbound', 'Margin_Debt', 'Northbound'] and abs(final_val) > 1e6:
                 final_val = final_val / 1e8
             
-            file_path = os.path.join(self.history_dir, f"{key}.csv")
-            new_row = pd.DataFrame([{"timestamp": timestamp, "value": round(final_val, 3)}])
-            
-            if os.path.exists(file_path):
-                try:
-                    df_existing = pd.read_csv(file_path)
-                    # 避免重复写入相同时间戳的数据
-                    if not df_existing.empty and str(df_existing.iloc[-1]["timestamp"]) == str(timestamp):
-                        continue
-                    new_row.to_csv(file_path, mode='a', header=False, index=False)
-                except:
-                    new_row.to_csv(file_path, index=False)
-            else:
-                new_row.to_csv(file_path, index=False)
+            rows[key] = (timestamp, round(final_val, 3))
+
+        return self.store.append_many(rows)
+
+    @property
+    def features(self):
+        if self._features is None:
+            self._features = FeatureEngine(state_file=None)
+        return self._features
+
+    def get_series(self, key):
+        """返回 (timestamps, values) 历史序列 (int64 epoch 秒 / float64)，读取自进程内共享缓存。"""
+        return self.store.cache.get(os.path.join(self.history_dir, f"{key}.csv"))
+
+    def list_keys(self):
+        return sorted(f[:-4] for f in os.listdir(self.history_dir) if f.endswith(".csv"))
+
+    def export_binary(self, keys=None):
+        """
+        将 CSV 历史转换为可内存映射的二进制列存 ({key}.ts.npy / {key}.val.npy)。
+        转换后读取自动走二进制路径，update_history 会同步追加两种格式。返回 {key: 行数}。
+        """
+        return {k: write_binary(os.path.join(self.history_dir, f"{k}.csv")) for k in (keys or self.list_keys())}
 
     def get_features(self, key):
         """
         计算特征：Percentile (分位)、Z-Score (偏离度)、Slope (斜率)。
+        由 FeatureEngine 在进程内增量维护，每次调用只回放上次之后新增的观测值。
         """
-        file_path = os.path.join(self.history_dir, f"{key}.csv")
-        if not os.path.exists(file_path):
-            return None
-        
         try:
-            df = pd.read_csv(file_path)
-            if df.empty or len(df) < 1:
+            series = self.get_series(key)
+            if series is None or len(series[1]) < 1:
                 return None
             
-            values = df["value"].astype(float).values
-            current = values[-1]
-            
-            return {
-                "value": current,
-                "p_20d": self._calc_percentile(values, 20),
-                "p_250d": self._calc_percentile(values, 250),
-                "p_1250d": self._calc_percentile(values, 1250),
-                "z_score": self._calc_zscore(values, 20),
-                "slope": self._calc_slope(values, 5)
-            }
+            return self.features.features(key, *series)
         except Exception as e:
             print(f"Error calculating features for {key}: {e}")
             return None
 
-    def _calc_percentile(self, values, window):
-        lookback = values[-window:]
-        if len(lookback) < 1: return 50.0
-        # 优化大样本下的计算效率
-        current_val = lookback[-1]
-        count = np.count_nonzero(lookback <= current_val)
-        return round(float(count / len(lookback)) * 100, 3)
-
-    def _calc_zscore(self, values, window):
-        lookback = values[-window:]
-        if len(lookback) < 2: return 0.0
-        mean = np.mean(lookback)
-        std = np.std(lookback)
-        if std == 0: return 0.0
-        return round(float((values[-1] - mean) / std), 2)
-
-    def _calc_slope(self, values, window):
-        lookback = values[-window:]
-        if len(lookback) < 2: return 0.0
-        x = np.arange(len(lookback))
-        y = lookback
-        slope, _ = np.polyfit(x, y, 1)
-        return round(float(slope), 4)
+    def get_feature_matrix(self, keys, pct_windows=(20, 250, 1250), z_window=20, slope_window=5):
+        """
+        批量计算多个指标的特征，返回 {key: 特征字典}，字段与 get_features 一致 (无历史的指标不返回)。
+        各序列按"最近观测点"右对齐装入同一个 (窗口 × 指标) 二维面板，不足部分以 NaN 填充，
+        所有指标的分位 / Z-Score / 斜率在一次向量化运算中得到。
+        """
+        depth = max(tuple(pct_windows) + (z_window, slope_window))
+        cols = []
+        panel = np.full((depth, len(keys)), np.nan)
+        for j, key in enumerate(keys):
+            series = self.get_series(key)
+            if series is None or len(series[1]) < 1:
+                continue
+            tail = series[1][-depth:]
+            panel[depth - len(tail):, j] = tail
+            cols.append(j)
+        if not cols:
+            return {}
+
+        panel = panel[:, cols]
+        current = panel[-1]
+        out = {"value": current}
+
+        for w in pct_windows:
+            win = panel[-w:]
+            n = np.count_nonzero(~np.isnan(win), axis=0)
+            out[f"p_{w}d"] = np.round(np.count_nonzero(win <= current, axis=0) / n * 100, 3)
+
+        win = panel[-z_window:]
+        n = np.count_nonzero(~np.isnan(win), axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.nanstd(win, axis=0)
+            z = (current - np.nanmean(win, axis=0)) / std
+        out["z_score"] = np.where((n >= 2) & (std > 0), np.round(z, 2), 0.0)
+
+        # 最小二乘斜率: Σ(x-x̄)(y-ȳ) / Σ(x-x̄)²，仅对有效观测点求和
+        win = panel[-slope_window:]
+        valid = ~np.isnan(win)
+        n = valid.sum(axis=0)
+        x = np.where(valid, np.arange(slope_window)[:, None], 0.0)
+        y = np.where(valid, win, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dx = np.where(valid, x - x.sum(axis=0) / n, 0.0)
+            dy = np.where(valid, y - y.sum(axis=0) / n, 0.0)
+            slope = (dx * dy).sum(axis=0) / (dx * dx).sum(axis=0)
+        out["slope"] = np.where(n >= 2, np.round(slope, 4), 0.0)
+
+        names = list(out)
+        return {keys[j]: {f: float(out[f][i]) for f in names} for i, j in enumerate(cols)}
+
+    def get_feature_series(self, key):
+        """
+        返回指标全部历史时点的特征序列 (DataFrame: timestamp, value, p_20d, p_250d, p_1250d, z_score, slope)。
+        结果缓存于 features_dir/{key}.csv；历史只追加新行时仅计算新增时点并追加写入，否则整体重算。
+        """
+        import pandas as pd
+        series = self.get_series(key)
+        if series is None or len(series[1]) < 1:
+            return None
+        ts, values = series
+        os.makedirs(self.features_dir, exist_ok=True)
+        cache_path = os.path.join(self.features_dir, f"{key}.csv")
+
+        cached = None
+        if os.path.exists(cache_path):
+            try:
+                cached = pd.read_csv(cache_path)
+                m = len(cached)
+                if m > len(values) or (m and to_epoch_seconds(cached["timestamp"].iloc[-1:])[0] != ts[m - 1]):
+                    cached = None
+            except Exception as e:
+                print(f"⚠️ Feature cache for {key} unreadable, rebuilding: {e}")
+                cached = None
+
+        start = len(cached) if cached is not None else 0
+        if cached is None or start < len(values):
+            feats = rolling_feature_series(values, start=start)
+            new_rows = pd.DataFrame({
+                "timestamp": pd.to_datetime(ts[start:], unit="s").strftime("%Y-%m-%d %H:%M"),
+                **feats
+            })
+            if cached is None:
+                new_rows.to_csv(cache_path, index=False)
+                cached = new_rows
+            else:
+                new_rows.to_csv(cache_path, mode='a', header=False, index=False)
+                cached = pd.concat([cached, new_rows], ignore_index=True)
+
+        cached["timestamp"] = pd.to_datetime(ts, unit="s")
+        return cached
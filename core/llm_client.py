@@ -0,0 +1,153 @@
+import asyncio
+import json
+import os
+import random
+import time
+
+class LLMClient:
+    """
+    异步模型调用层 (基于 genai.Client.aio):
+    - deadline: 整个调用 (含重试) 的硬性时限；timeout: 单轮请求时限
+    - 瞬时错误 (超时 / 连接错误 / 408 / 429 / 5xx) 按指数退避重试
+    - hedge_percentile: 单轮请求耗时超过历史成功延迟的该分位数时，并行发出一条对冲请求，先返回者胜出
+    每次请求的耗时与结果记录在 attempts 列表中，供写入决策文件。
+    """
+    LATENCY_KEEP = 100
+    HEDGE_MIN_SAMPLES = 10
+
+    def __init__(self, client, model_id, deadline=90, timeout=45, max_retries=2, backoff=2.0,
+                 hedge_percentile=None, latency_file="data/audit/_latency.json"):
+        self.client = client
+        self.model_id = model_id
+        self.deadline = deadline
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.hedge_percentile = hedge_percentile
+        self.latency_file = latency_file
+
+    async def generate(self, contents, config=None):
+        """返回 (response, attempts)。全部重试失败或超出 deadline 时抛出最后一个异常，异常对象附带 attempts。"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        attempts = []
+        for retry in range(self.max_retries + 1):
+            remaining = deadline - loop.time()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError(f"deadline {self.deadline}s exceeded")
+                response, latency = await self._round(contents, config, retry, min(self.timeout, remaining), attempts)
+                self._record_latency(latency)
+                return response, attempts
+            except Exception as e:
+                error = e
+                if not _is_transient(e) or retry == self.max_retries:
+                    break
+                delay = self.backoff * (2 ** retry) * (0.5 + random.random() / 2)
+                if loop.time() + delay >= deadline:
+                    break
+                await asyncio.sleep(delay)
+        error.attempts = attempts
+        raise error
+
+    async def _round(self, contents, config, retry, timeout, attempts):
+        """单轮请求 (可能附带一条对冲请求)，返回首个成功的 (response, 耗时秒)。"""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        hedge_at = self.hedge_delay()
+        tasks = []
+
+        def launch(hedge):
+            entry = {"attempt": retry + 1, "hedge": hedge}
+            attempts.append(entry)
+            tasks.append(asyncio.create_task(self._timed(contents, config, entry)))
+
+        launch(False)
+        pending = set(tasks)
+        error = None
+        timed_out = False
+        try:
+            while pending:
+                elapsed = loop.time() - start
+                wait = timeout - elapsed
+                hedge_due = hedge_at is not None and len(tasks) == 1 and hedge_at < timeout
+                if hedge_due:
+                    wait = min(wait, hedge_at - elapsed)
+                if wait > 0:
+                    done, pending = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    done = set()
+                for t in done:
+                    if t.exception() is None:
+                        return t.result(), loop.time() - start
+                    error = t.exception()
+                if done:
+                    continue
+                if hedge_due and loop.time() - start >= hedge_at:
+                    launch(True)
+                    pending.add(tasks[-1])
+                elif loop.time() - start >= timeout:
+                    timed_out = True
+                    raise asyncio.TimeoutError(f"no response within {timeout:.0f}s")
+            raise error
+        finally:
+            for t in tasks:
+                if not t.done(): t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if timed_out:
+                for entry in attempts:
+                    if entry.get("outcome") == "cancelled": entry["outcome"] = "timeout"
+
+    async def _timed(self, contents, config, entry):
+        t0 = time.perf_counter()
+        try:
+            response = await self.client.aio.models.generate_content(model=self.model_id, contents=contents, config=config)
+            entry["outcome"] = "ok"
+            return response
+        except asyncio.CancelledError:
+            entry["outcome"] = "cancelled"
+            raise
+        except Exception as e:
+            entry["outcome"] = f"error: {type(e).__name__}: {e}"[:200]
+            raise
+        finally:
+            entry["latency_ms"] = round((time.perf_counter() - t0) * 1000)
+
+    def retries(self, attempts):
+        """重试轮数 (对冲请求不计入)。"""
+        return max(0, len({a["attempt"] for a in attempts}) - 1)
+
+    def hedge_delay(self):
+        """对冲触发时刻 (秒): 历史成功延迟的 hedge_percentile 分位；未启用或样本不足时返回 None。"""
+        if self.hedge_percentile is None:
+            return None
+        samples = sorted(self._load_latency())
+        if len(samples) < self.HEDGE_MIN_SAMPLES:
+            return None
+        idx = min(len(samples) - 1, int(len(samples) * self.hedge_percentile / 100))
+        return samples[idx]
+
+    def _record_latency(self, latency):
+        samples = (self._load_latency() + [round(latency, 3)])[-self.LATENCY_KEEP:]
+        os.makedirs(os.path.dirname(self.latency_file) or ".", exist_ok=True)
+        tmp_path = self.latency_file + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(samples, f)
+        os.replace(tmp_path, self.latency_file)
+
+    def _load_latency(self):
+        if not os.path.exists(self.latency_file):
+            return []
+        try:
+            with open(self.latency_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except: return []
+
+def _is_transient(e):
+    if isinstance(e, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    code = getattr(e, 'code', None)
+    if isinstance(code, int):
+        return code in (408, 429) or code >= 500
+    # httpx 的连接 / 读取超时等传输层异常
+    return type(e).__module__.startswith("httpx")
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+import pytz
+from core.telemetry import TELEMETRY
+
+class Stage:
+    """
+    流水线阶段: fn 无参调用，返回 None 视为失败；inputs / outputs 为声明的文件产物。
+    always=True 的阶段 (如行情采集) 输入来自外部，每轮都执行，只有断点续跑时才复用上次的产物。
+    """
+    def __init__(self, name, fn, inputs=(), outputs=(), always=False):
+        self.name = name
+        self.fn = fn
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.always = always
+
+class Pipeline:
+    """
+    按内容哈希调度的流水线 (阶段按声明顺序构成线性 DAG)。
+    每个阶段完成后把输入 / 输出产物的 SHA-1 写入检查点 data/pipeline/checkpoint.json:
+    - 输入哈希与上次成功时相同且输出产物未被改动 → 跳过该阶段 (哈希规则见 file_hash，忽略每轮变化的时间戳字段)
+    - 某阶段失败时其下游不再执行；resume=True 重跑时复用上游已成功阶段的产物，从失败阶段继续
+    """
+    def __init__(self, stages, checkpoint_file="data/pipeline/checkpoint.json"):
+        self.stages = stages
+        self.checkpoint_file = checkpoint_file
+        self.beijing_tz = pytz.timezone('Asia/Shanghai')
+        self.state = self._load()
+
+    def run(self, resume=False, force=False):
+        """返回 {阶段: "ran" / "skipped" / "failed"}；阶段抛出的异常在写入检查点后继续向外抛出。"""
+        results = {}
+        for stage in self.stages:
+            inputs = {p: file_hash(p) for p in stage.inputs}
+            if not force and self._fresh(stage, inputs, resume):
+                print(f"⏭️ 阶段 {stage.name}: {'断点续跑' if stage.always else '输入未变化'}，复用上次产物")
+                results[stage.name] = "skipped"
+                continue
+            try:
+                with TELEMETRY.span(stage.name, kind="stage") as sp:
+                    result = stage.fn()
+                    if result is None: sp.outcome = "failed"
+            except Exception as e:
+                self._record(stage, inputs, "failed", error=f"{type(e).__name__}: {e}")
+                results[stage.name] = "failed"
+                raise
+            if result is None:
+                self._record(stage, inputs, "failed", error="no result")
+                results[stage.name] = "failed"
+                break
+            self._record(stage, inputs, "ok")
+            results[stage.name] = "ran"
+        return results
+
+    def _fresh(self, stage, inputs, resume):
+        rec = self.state.get(stage.name)
+        if not rec or rec.get("status") != "ok":
+            return False
+        if stage.always and not resume:
+            return False
+        if rec.get("inputs") != inputs:
+            return False
+        return all(os.path.exists(p) and file_hash(p) == rec.get("outputs", {}).get(p) for p in stage.outputs)
+
+    def _record(self, stage, inputs, status, error=None):
+        entry = {
+            "status": status,
+            "inputs": inputs,
+            "outputs": {p: file_hash(p) for p in stage.outputs},
+            "finished_at": datetime.now(self.beijing_tz).strftime("%Y-%m-%d %H:%M:%S")
+        }
+        if error: entry["error"] = error
+        self.state[stage.name] = entry
+        os.makedirs(os.path.dirname(self.checkpoint_file) or ".", exist_ok=True)
+        tmp_path = self.checkpoint_file + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.checkpoint_file)
+
+    def _load(self):
+        if not os.path.exists(self.checkpoint_file):
+            return {}
+        try:
+            with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except: return {}
+
+# 每轮都会变化、但不代表数据变化的字段 (采集时刻、各指标更新时间、响应缓存命中统计)
+VOLATILE_KEYS = ("timestamp", "last_update", "cache")
+
+def file_hash(path):
+    """
+    产物的内容 SHA-1；不存在时返回 None。
+    - JSON 文件: 去掉 VOLATILE_KEYS 后按键排序规范化再哈希，仅时间戳不同的快照 / 指标视为未变化
+    - 目录: 目录下数据文件 (忽略 "_" 开头的派生状态与 .tmp) 的文件名与内容哈希
+    """
+    if os.path.isdir(path):
+        h = hashlib.sha1()
+        for name in sorted(os.listdir(path)):
+            if name.startswith("_") or name.endswith(".tmp"): continue
+            child = os.path.join(path, name)
+            if os.path.isfile(child):
+                h.update(f"{name}:{file_hash(child)}\n".encode('utf-8'))
+        return h.hexdigest()
+    if not os.path.exists(path):
+        return None
+    if path.endswith(".json"):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                raw = json.dumps(_canonical(json.load(f)), ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+            return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+        except ValueError:
+            pass
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _canonical(obj):
+    if isinstance(obj, dict):
+        return {k: _canonical(v) for k, v in obj.items() if k not in VOLATILE_KEYS}
+    if isinstance(obj, list):
+        return [_canonical(v) for v in obj]
+    return obj
@@ -0,0 +1,102 @@
+from datetime import datetime
+
+# macro_health 以原始采集键记录，macro_matrix 中沪深300振幅改名为 A_Share_Vol
+HEALTH_ALIAS = {"CSI300_Vol": "A_Share_Vol"}
+# 过期指标只保留数值与分位，丢弃依赖最新观测的动量类字段
+STALE_FIELDS = ("change_pct", "pct_change", "z_score", "slope")
+
+def encode_table(rows, columns=None, index=None):
+    """
+    表头只出现一次的紧凑表格: 首行为列名，之后每行一个记录，以 | 分隔，缺失值记为 -。
+    rows 为字典列表；index 指定首列名时 rows 为 {行名: 字典}。
+    """
+    if index:
+        rows = [{index: k, **v} for k, v in rows.items()]
+    if columns is None:
+        columns = []
+        for r in rows:
+            columns.extend(c for c in r if c not in columns)
+    lines = ["|".join(columns)]
+    lines.extend("|".join(_fmt(r.get(c)) for c in columns) for r in rows)
+    return "\n".join(lines)
+
+def decode_table(text, index=None, numeric=()):
+    """
+    encode_table 的逆变换 (用于校验与调试): - 还原为 None，numeric 中的列转为 float，其余保持字符串。
+    指定 index 时返回 {行名: 字典}，否则返回字典列表。
+    """
+    lines = [l for l in text.strip().splitlines() if l]
+    columns = lines[0].split("|")
+    rows = []
+    for line in lines[1:]:
+        row = {}
+        for c, v in zip(columns, line.split("|")):
+            row[c] = None if v == "-" else float(v) if c in numeric else v
+        rows.append(row)
+    if index:
+        return {r.pop(index): r for r in rows}
+    return rows
+
+def stale_keys(metrics, stale_hours=24):
+    """
+    依据 macro_health 判定过期指标: status 非 SUCCESS，或 last_update 与数据时间相差超过 stale_hours。
+    返回 {macro_matrix 键: 原因}。
+    """
+    data_time = _parse(metrics.get('timestamp'))
+    out = {}
+    for key, health in metrics.get('macro_health', {}).items():
+        key = HEALTH_ALIAS.get(key, key)
+        if health.get('status') != 'SUCCESS':
+            out[key] = health.get('status', 'FAILED')
+            continue
+        updated = _parse(health.get('last_update'))
+        if data_time and updated and abs((data_time - updated).total_seconds()) > stale_hours * 3600:
+            out[key] = f"last_update {health.get('last_update')}"
+    return out
+
+def compact_metrics(metrics, top_k=10, priority=(), stale_hours=24):
+    """
+    将指标矩阵编码为紧凑的文本表格 (替代 json.dumps(indent=2)):
+    - technical_matrix: 按乖离率取前 top_k 行，priority 中的代码 (规则触发标的) 始终保留
+    - macro_matrix: 每个指标一行；过期指标剔除动量类字段并标记 stale
+    - macro_health: 只列出异常指标
+    返回 (文本, 统计)。
+    """
+    stale = stale_keys(metrics, stale_hours)
+    macro = {}
+    for key, row in metrics.get('macro_matrix', {}).items():
+        row = dict(row)
+        if key in stale:
+            for f in STALE_FIELDS: row.pop(f, None)
+        row["stale"] = 1 if key in stale else 0
+        macro[key] = row
+
+    tech = sorted((r for r in metrics.get('technical_matrix', []) if r.get('bias') is not None), key=lambda r: r['bias'])
+    priority = set(priority)
+    rows = [r for i, r in enumerate(tech) if i < top_k or r.get('code') in priority]
+
+    sections = [f"timestamp: {metrics.get('timestamp', 'unknown')}"]
+    sections.append(f"macro_matrix ({len(macro)} 项):\n" + encode_table(macro, index="key"))
+    if stale:
+        sections.append("macro_health 异常 (其余指标 SUCCESS 且时效正常):\n" + "\n".join(f"{k}: {v}" for k, v in stale.items()))
+    else:
+        sections.append("macro_health: 全部指标 SUCCESS 且时效正常")
+    sections.append(f"technical_matrix (乖离率最低的 {len(rows)}/{len(tech)} 个标的):\n" + encode_table(rows))
+    text = "\n\n".join(sections)
+    return text, {"tech_rows": len(rows), "tech_total": len(tech), "stale": sorted(stale)}
+
+def _fmt(v):
+    if v is None: return "-"
+    if isinstance(v, float):
+        if v != v: return "-"
+        s = f"{v:.4f}".rstrip('0').rstrip('.')
+        return "0" if s == "-0" else s
+    return str(v)
+
+def _parse(ts):
+    for fmt in ("%Y-%m-%d %H:%M", "%Y%m%d_%H%M"):
+        try:
+            return datetime.strptime(str(ts), fmt)
+        except (TypeError, ValueError):
+            continue
+    return None
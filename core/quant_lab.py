@@ -1,16 +1,25 @@
 import json
 import os
-import pandas as pd
+import numpy as np
 from core.intel_engine import IntelEngine
+from core.bar_store import BarStore
+from core.indicators import IndicatorEngine
 
 class QuantLab:
     """
     模块 B: 逻辑计算引擎 - V14.1 (Precision & Unit Robust)
     """
-    def __init__(self, raw_file="data/raw/latest_snap.json", out_dir="data/processed"):
+    MACRO_KEYS = ['CNH', 'Nasdaq', 'HangSeng', 'A50_Futures', 'VIX', 'Gold', 'CrudeOil', 'CN10Y', 'US10Y', 'SHIBOR', 'CSI300_Vol', 'Southbound', 'Margin_Debt']
+
+    def __init__(self, raw_file="data/raw/latest_snap.json", out_dir="data/processed", bars_dir="data/bars", universe_bars_dir="data/universe/bars", intel=None):
         self.raw_file = raw_file
         self.out_dir = out_dir
-        self.intel = IntelEngine()
+        # 可传入已有的 IntelEngine (常驻进程中与历史更新阶段共享同一份历史缓存)
+        self.intel = intel or IntelEngine()
+        self.bars = BarStore(bars_dir)
+        # 全市场模式下预筛候选的日线 (见 Harvester.universe_bars_dir)
+        self.universe_bars_dir = universe_bars_dir
+        self.indicators = IndicatorEngine(os.path.join(bars_dir, "_indicators.json"))
         os.makedirs(self.out_dir, exist_ok=True)
 
     def process(self):
@@ -21,12 +30,15 @@ class QuantLab:
         with open(self.raw_file, 'r') as f:
             raw = json.load(f)
 
+        timestamp = raw.get('meta', {}).get('timestamp', 'unknown')
+        hist_map = self._load_hist(raw)
         processed = {
-            "timestamp": raw.get('meta', {}).get('timestamp', 'unknown'),
+            "timestamp": timestamp,
             "macro_matrix": self._calc_macro(raw.get('macro', {})),
             "macro_health": {k: {"status": v.get('status', 'FAILED'), "last_update": v.get('last_update', 'unknown')} for k, v in raw.get('macro', {}).items()},
-            "technical_matrix": self._calc_tech(raw.get('etf_spot', []), raw.get('hist_data', {}))
+            "technical_matrix": self.indicators.enrich(self._calc_tech(raw.get('etf_spot', []), hist_map), hist_map, _as_of_date(timestamp))
         }
+        self.indicators.save()
 
         out_path = f"{self.out_dir}/metrics_{processed['timestamp'].replace(' ', '_').replace(':', '')}.json"
         with open(out_path, 'w', encoding='utf-8') as f:
@@ -38,9 +50,25 @@ class QuantLab:
         print(f"📈 量化特征矩阵已生成: {out_path}")
         return processed
 
+    def _load_hist(self, raw):
+        """
+        K 线历史优先读取 BarStore (核心监测池，其次全市场候选)；旧版快照内嵌的 hist_data 仅作兜底。
+        全市场候选的日线只取本轮抓取过的代码 (meta.kline_codes)，早先入选、本轮未通过预筛的存档末日已过期，不参与计算。
+        """
+        codes = [s.get('代码') for s in raw.get('etf_spot', []) if s.get('代码')]
+        hist_map = dict(raw.get('hist_data', {}))
+        hist_map.update(self.bars.load_map(codes))
+        fetched = set(raw.get('meta', {}).get('kline_codes', []))
+        if fetched and os.path.isdir(self.universe_bars_dir):
+            rest = [c for c in codes if c not in hist_map and c in fetched]
+            hist_map.update(BarStore(self.universe_bars_dir).load_map(rest))
+        return hist_map
+
     def _calc_macro(self, raw_macro):
         """处理宏观矩阵 - V14 特征全貌版 (带单位鲁棒性)"""
         m = {}
+        # 全部指标的历史特征一次性批量计算
+        feature_matrix = self.intel.get_feature_matrix(self.MACRO_KEYS)
         
         def get_full_signal(key, subkey='price'):
             ind = raw_macro.get(key, {})
@@ -51,7 +79,7 @@ class QuantLab:
                     val = ind.get('value') or ind.get('yield')
             
             # 获取历史特征
-            features = self.intel.get_features(key) or {}
+            features = feature_matrix.get(key, {})
             
             # 1. 实时值提取与单位对齐 (Billion Normalization)
             final_val = val if val is not None else features.get("value")
@@ -86,7 +114,7 @@ class QuantLab:
         
         # 特殊处理：沪深300振幅
         csi300_data = raw_macro.get('CSI300_Vol', {})
-        csi300_features = self.intel.get_features('CSI300_Vol') or {}
+        csi300_features = feature_matrix.get('CSI300_Vol', {})
         m['A_Share_Vol'] = {
             "amplitude": round(float(csi300_data.get('amplitude', 0)), 3) if csi300_data.get('amplitude') else 0.0,
             "pct_change": round(float(csi300_data.get('pct_change', 0)), 3) if csi300_data.get('pct_change') else 0.0,
@@ -104,43 +132,60 @@ class QuantLab:
         return m
 
     def _calc_tech(self, spot, hist_map):
-        matrix = []
+        """
+        技术矩阵 (向量化): 全部标的最近的收盘价 / 成交量右对齐堆叠为二维数组 (不足补 NaN)，
+        单位换算 (LOT → 股) 以乘数向量完成，实时 MA5 乖离与量比对整个标的池一次性计算。
+        """
         if not spot: return []
-            
-        for s in spot:
-            try:
-                code = s.get('代码')
-                if not code or code not in hist_map: continue
-                df_hist = pd.DataFrame(hist_map[code])
-                if len(df_hist) < 4: continue
-                
-                current_price = float(s.get('最新价', 0))
-                closes_hist = df_hist['收盘'].dropna().astype(float).tolist()
-                
-                real_time_ma5 = (sum(closes_hist[-4:]) + current_price) / 5
-                bias = (current_price / real_time_ma5 - 1) * 100 if real_time_ma5 != 0 else None
-                
-                vols_hist = df_hist['成交量'].dropna().astype(float).tolist()
-                if df_hist.iloc[0].get('unit') == 'LOT':
-                    vols_hist = [v * 100 for v in vols_hist]
-                
-                current_vol = float(s.get('成交量', 0))
-                if s.get('unit') == 'LOT':
-                    current_vol *= 100
-                
-                vol_avg = sum(vols_hist[-5:]) / 5 if len(vols_hist) >= 5 else (sum(vols_hist) / len(vols_hist) if vols_hist else 0)
-                vol_ratio = current_vol / vol_avg if vol_avg > 0 else None
-                
-                matrix.append({
-                    "code": code,
-                    "name": s.get('名称', 'N/A'),
-                    "price": current_price,
-                    "bias": round(bias, 2) if bias is not None else None,
-                    "vol_ratio": round(vol_ratio, 2) if vol_ratio is not None else None
-                })
-            except: pass
-                
-        return sorted([m for m in matrix if m['bias'] is not None], key=lambda x: x['bias'])
+        rows = [s for s in spot if s.get('代码') and len(hist_map.get(s.get('代码')) or []) >= 4]
+        if not rows: return []
+
+        n = len(rows)
+        closes = np.full((n, 4), np.nan)
+        vols = np.full((n, 5), np.nan)
+        price = np.array([_to_float(s.get('最新价', 0)) for s in rows])
+        cur_vol = np.array([_to_float(s.get('成交量', 0)) for s in rows])
+        spot_mult = np.array([100.0 if s.get('unit') == 'LOT' else 1.0 for s in rows])
+        hist_mult = np.empty(n)
+        for i, s in enumerate(rows):
+            bars = hist_map[s['代码']]
+            hist_mult[i] = 100.0 if bars[0].get('unit') == 'LOT' else 1.0
+            # 只需末尾少量 K 线: 最近 4 根收盘、5 根成交量 (剔除缺失值)
+            tail = bars[-10:]
+            c = [x for x in (_to_float(b.get('收盘')) for b in tail) if x == x][-4:]
+            v = [x for x in (_to_float(b.get('成交量')) for b in tail) if x == x][-5:]
+            if c: closes[i, 4 - len(c):] = c
+            if v: vols[i, 5 - len(v):] = v
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ma5 = (np.nansum(closes, axis=1) + price) / 5
+            bias = np.where(ma5 != 0, (price / ma5 - 1) * 100, np.nan)
+            vol_avg = np.nansum(vols * hist_mult[:, None], axis=1) / np.count_nonzero(~np.isnan(vols), axis=1)
+            vol_ratio = np.where(vol_avg > 0, cur_vol * spot_mult / vol_avg, np.nan)
+        bias = np.round(bias, 2)
+        vol_ratio = np.round(vol_ratio, 2)
+
+        order = np.argsort(bias, kind='stable')
+        return [{
+            "code": rows[i]['代码'],
+            "name": rows[i].get('名称', 'N/A'),
+            "price": float(price[i]),
+            "bias": float(bias[i]),
+            "vol_ratio": float(vol_ratio[i]) if not np.isnan(vol_ratio[i]) else None
+        } for i in order if not np.isnan(bias[i])]
+
+def _as_of_date(timestamp):
+    """快照时间戳 -> YYYY-MM-DD (兼容早期的 YYYYMMDD_HHMM 格式)。"""
+    ts = str(timestamp)
+    if len(ts) >= 10 and ts[4] == '-': return ts[:10]
+    if len(ts) >= 8 and ts[:8].isdigit(): return f"{ts[:4]}-{ts[4:6]}-{ts[6:8]}"
+    return "9999-12-31"
+
+def _to_float(x):
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return np.nan
 
 if __name__ == "__main__":
     QuantLab().process()
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+import pytz
+from core.telemetry import TELEMETRY
+
+class ResponseCache:
+    """
+    慢变量数据源的本地响应缓存 (data/cache/{source}_{hash}.json)。
+    以 数据源 + 调用参数 为键；条目在 TTL 到期或下一个发布时刻 (北京时间) 之后失效，取较早者。
+    """
+    def __init__(self, cache_dir="data/cache"):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.beijing_tz = pytz.timezone('Asia/Shanghai')
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {}
+
+    def stats(self):
+        with self._lock:
+            by_source = {k: dict(v) for k, v in self._stats.items()}
+        return {
+            "hits": sum(v["hit"] for v in by_source.values()),
+            "misses": sum(v["miss"] for v in by_source.values()),
+            "by_source": by_source
+        }
+
+    def fetch(self, source, fn, *args, ttl=86400, publish_at=None, keep_tail=None, **kwargs):
+        """
+        读取缓存或调用 fn(*args, **kwargs)。fn 需返回 DataFrame。
+        publish_at: "HH:MM" 数据源每日发布时刻，缓存不会跨越下一次发布。
+        keep_tail: 只缓存末尾 N 行 (调用方只使用最新数据时可大幅减小存档)。
+        """
+        path = self._path(source, args, kwargs)
+        now = time.time()
+        entry = self._read(path)
+        if entry and now < entry.get("expires_at", 0):
+            self._count(source, "hit")
+            return self._from_payload(entry["payload"])
+
+        self._count(source, "miss")
+        with TELEMETRY.span(f"akshare.{source}"):
+            df = fn(*args, **kwargs)
+        if df is None or df.empty:
+            return df
+        if keep_tail:
+            df = df.tail(keep_tail)
+
+        expires_at = now + ttl
+        if publish_at:
+            expires_at = min(expires_at, self.next_publication(now, publish_at))
+        entry = {
+            "source": source,
+            "args": [list(args), kwargs],
+            "fetched_at": datetime.fromtimestamp(now, self.beijing_tz).strftime("%Y-%m-%d %H:%M"),
+            "expires_at": expires_at,
+            "payload": self._to_payload(df)
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return df
+
+    def next_publication(self, ts, publish_at):
+        """ts 之后下一个工作日的 publish_at 时刻 (北京时间) 的 epoch 秒。"""
+        hour, minute = (int(x) for x in publish_at.split(':'))
+        now = datetime.fromtimestamp(ts, self.beijing_tz)
+        nxt = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if nxt <= now:
+            nxt += timedelta(days=1)
+        while nxt.weekday() >= 5:
+            nxt += timedelta(days=1)
+        return nxt.timestamp()
+
+    def _path(self, source, args, kwargs):
+        raw = json.dumps([source, list(args), sorted(kwargs.items())], ensure_ascii=False, default=str)
+        digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{source}_{digest}.json")
+
+    def _read(self, path):
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except: return None
+
+    def _count(self, source, kind):
+        with self._lock:
+            s = self._stats.setdefault(source, {"hit": 0, "miss": 0})
+            s[kind] += 1
+
+    def _to_payload(self, df):
+        return json.loads(df.to_json(orient="split", index=False, date_format="iso", force_ascii=False))
+
+    def _from_payload(self, payload):
+        import pandas as pd
+        return pd.DataFrame(payload["data"], columns=payload["columns"])
@@ -0,0 +1,56 @@
+class RuleEngine:
+    """
+    确定性规则预筛 (位于 AI 审计之前): 按 SOP 技术触发条件 "乖离率 < bias_th 且 量比 > vol_th" 扫描技术矩阵。
+    - margin: 乖离率阈值的放宽幅度 (百分点)，接近触发的标的同样交由 AI 审计
+    - 触发集合为空时可直接在本地生成 WAIT 决策 (字段与 AI 决策一致，附 source: rule_engine)，省去一次模型调用
+    """
+    SOURCE = "rule_engine"
+    DEFAULT_PARAMETERS = {"stop_loss": -1.5, "stop_profit": 3.0, "time_limit": "4天"}
+
+    def __init__(self, bias_th=-2.5, vol_th=1.2, margin=0.0, top_n=5):
+        self.bias_th = bias_th
+        self.vol_th = vol_th
+        self.margin = margin
+        self.top_n = top_n
+
+    def screen(self, metrics):
+        """返回 {"triggered": 触发标的, "closest": 乖离率最低的 top_n 个标的, "universe": 标的数}。"""
+        rows = [r for r in metrics.get('technical_matrix', []) if r.get('bias') is not None]
+        triggered = [r for r in rows if self._triggered(r)]
+        closest = sorted(rows, key=lambda r: r['bias'])[:self.top_n]
+        return {
+            "triggered": [self._candidate(r) for r in sorted(triggered, key=lambda r: r['bias'])],
+            "closest": [self._candidate(r) for r in closest],
+            "universe": len(rows)
+        }
+
+    def wait_decision(self, metrics, screen=None):
+        """触发集合为空时的本地 WAIT 决策。"""
+        screen = screen or self.screen(metrics)
+        data_time = metrics.get('timestamp', 'unknown')
+        rule = f"乖离率 < {self.bias_th}% 且 量比 > {self.vol_th}"
+        if screen["closest"]:
+            c = screen["closest"][0]
+            nearest = f"最接近的 {c['name']} ({c['code']}) 乖离率 {c['bias']}%、量比 {c['vol_ratio']}，尚未触及阈值。"
+        else:
+            nearest = "技术矩阵为空，无可评估标的。"
+        return {
+            "decision": "WAIT",
+            "target": "NONE",
+            "attack_factor": 1.0,
+            "rationale": f"基于 {data_time} 的实时行情数据，规则引擎预筛显示：监测池 {screen['universe']} 个标的均未满足技术触发条件 ({rule})。{nearest}技术面未触发，无需宏观共振验证，维持观望。",
+            "parameters": dict(self.DEFAULT_PARAMETERS),
+            "top_candidates": screen["closest"],
+            "source": self.SOURCE
+        }
+
+    def _triggered(self, row, margin=None):
+        margin = self.margin if margin is None else margin
+        return row['bias'] < self.bias_th + margin and (row.get('vol_ratio') or 0) > self.vol_th
+
+    def _candidate(self, row):
+        """与 AI 决策的 top_candidates 字段一致 (含 status；仅在 margin 放宽范围内触发的记为 NEAR_TRIGGER)。"""
+        if self._triggered(row, margin=0.0): status = "TRIGGERED"
+        elif self._triggered(row): status = "NEAR_TRIGGER"
+        else: status = "NOT_TRIGGERED"
+        return {"code": row.get('code'), "name": row.get('name', 'N/A'), "bias": row.get('bias'), "vol_ratio": row.get('vol_ratio'), "status": status}
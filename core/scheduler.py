@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+import pytz
+
+class IntradayScheduler:
+    """
+    盘中定时调度 (北京时间): 工作日 start–end 之间，从 start 起每 interval_minutes 分钟一个运行时点。
+    例如 09:30–15:00、每 5 分钟 → 09:30, 09:35, ..., 15:00。
+    传入 TradingCalendar 时按交易日历跳过节假日，否则只跳过周末。
+    """
+    def __init__(self, interval_minutes=5, start="09:30", end="15:00", calendar=None):
+        self.calendar = calendar
+        self.interval = timedelta(minutes=interval_minutes)
+        self.start = tuple(int(x) for x in start.split(':'))
+        self.end = tuple(int(x) for x in end.split(':'))
+        self.beijing_tz = pytz.timezone('Asia/Shanghai')
+
+    def is_trading_day(self, day):
+        if self.calendar is not None:
+            return self.calendar.is_trading_day(day)
+        return day.weekday() < 5
+
+    def next_run(self, now=None):
+        """now 之后 (含 now 所在的整点时刻) 的下一个运行时点。"""
+        now = now or datetime.now(self.beijing_tz)
+        day = now.replace(second=0, microsecond=0)
+        for _ in range(14):
+            if self.is_trading_day(day.date()):
+                open_at = day.replace(hour=self.start[0], minute=self.start[1])
+                close_at = day.replace(hour=self.end[0], minute=self.end[1])
+                if now <= open_at:
+                    return open_at
+                if now <= close_at:
+                    steps = -(-(now - open_at) // self.interval)
+                    slot = open_at + steps * self.interval
+                    if slot <= close_at:
+                        return slot
+            day = (day + timedelta(days=1)).replace(hour=0, minute=0)
+        return None
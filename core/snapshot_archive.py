@@ -0,0 +1,78 @@
+import gzip
+import json
+import os
+
+class SnapshotArchive:
+    """
+    快照归档: 每个交易日一个只追加的压缩段 data/archive/snap_YYYYMMDD.jsonl.gz。
+    每条快照单独压缩为一个 gzip member 后顺序拼接 (整个段仍是合法的 gzip/JSONL 文件)，
+    偏移索引 snap_YYYYMMDD.idx.json 记录每条快照的 [时间戳, 起始偏移, 长度]，随机读取单条快照无需解压整段。
+    """
+    def __init__(self, archive_dir="data/archive"):
+        self.archive_dir = archive_dir
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+    def segment_paths(self, day):
+        return (os.path.join(self.archive_dir, f"snap_{day}.jsonl.gz"),
+                os.path.join(self.archive_dir, f"snap_{day}.idx.json"))
+
+    def append(self, snapshot):
+        """追加一条快照，同一时间戳的快照只保留首条。返回是否写入。"""
+        timestamp = snapshot.get("meta", {}).get("timestamp", "unknown")
+        day = self._day(timestamp)
+        seg_path, idx_path = self.segment_paths(day)
+        index = self._load_index(idx_path)
+        if any(e[0] == timestamp for e in index):
+            return False
+
+        line = json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')) + "\n"
+        member = gzip.compress(line.encode('utf-8'), mtime=0)
+        with open(seg_path, 'ab') as f:
+            offset = f.tell()
+            f.write(member)
+        index.append([timestamp, offset, len(member)])
+        tmp_path = idx_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, idx_path)
+        return True
+
+    def days(self):
+        return sorted(f[5:13] for f in os.listdir(self.archive_dir) if f.startswith("snap_") and f.endswith(".idx.json"))
+
+    def list(self, day=None):
+        """返回 [(时间戳, 交易日)]，按时间顺序。"""
+        out = []
+        for d in ([day] if day else self.days()):
+            out.extend((e[0], d) for e in self._load_index(self.segment_paths(d)[1]))
+        return out
+
+    def get(self, timestamp):
+        """按时间戳读取单条快照 (只解压该条)，不存在时返回 None。"""
+        day = self._day(timestamp)
+        seg_path, idx_path = self.segment_paths(day)
+        for ts, offset, length in self._load_index(idx_path):
+            if ts == timestamp:
+                with open(seg_path, 'rb') as f:
+                    f.seek(offset)
+                    return json.loads(gzip.decompress(f.read(length)))
+        return None
+
+    def iter_snapshots(self, day=None):
+        """按时间顺序遍历快照。"""
+        for d in ([day] if day else self.days()):
+            seg_path, idx_path = self.segment_paths(d)
+            with open(seg_path, 'rb') as f:
+                for _, offset, length in self._load_index(idx_path):
+                    f.seek(offset)
+                    yield json.loads(gzip.decompress(f.read(length)))
+
+    def _day(self, timestamp):
+        digits = "".join(ch for ch in str(timestamp) if ch.isdigit())
+        return digits[:8] if len(digits) >= 8 else "unknown"
+
+    def _load_index(self, idx_path):
+        if not os.path.exists(idx_path):
+            return []
+        with open(idx_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
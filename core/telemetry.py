@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import pytz
+
+class Span:
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        self.bytes = 0
+        self.retries = 0
+        self.outcome = "ok"
+        self.ms = None
+
+class Telemetry:
+    """
+    运行遥测: 按流水线阶段 (stage) 与外部数据源 (source) 记录耗时、下载字节数、重试次数与结果。
+    每轮运行汇总为一行追加到 data/telemetry/run_metrics.jsonl (只保留最近 keep_runs 轮)，
+    summary() 给出最近 N 轮各阶段 / 数据源的 P50 / P95 耗时。未调用 start() 时 span 只计时不记录。
+    """
+    def __init__(self, metrics_file="data/telemetry/run_metrics.jsonl", keep_runs=500):
+        self.metrics_file = metrics_file
+        self.keep_runs = keep_runs
+        self.beijing_tz = pytz.timezone('Asia/Shanghai')
+        self._lock = threading.Lock()
+        self._active = False
+        self._spans = {}
+        self._t0 = None
+
+    def start(self):
+        with self._lock:
+            self._active = True
+            self._spans = {}
+            self._t0 = time.perf_counter()
+
+    @contextmanager
+    def span(self, name, kind="source"):
+        """
+        with TELEMETRY.span("sina.kline") as sp: ...  —  可在块内设置 sp.bytes / sp.retries / sp.outcome。
+        块内抛出异常时结果记为 error (异常照常向外抛出)。
+        """
+        sp = Span(name, kind)
+        t0 = time.perf_counter()
+        try:
+            yield sp
+        except BaseException as e:
+            sp.outcome = f"error: {type(e).__name__}"
+            raise
+        finally:
+            sp.ms = (time.perf_counter() - t0) * 1000
+            self._add(sp)
+
+    def _add(self, sp):
+        with self._lock:
+            if not self._active: return
+            agg = self._spans.setdefault(sp.name, {"kind": sp.kind, "n": 0, "ms": 0.0, "max_ms": 0.0, "bytes": 0, "retries": 0, "errors": 0})
+            agg["n"] += 1
+            agg["ms"] += sp.ms
+            agg["max_ms"] = max(agg["max_ms"], sp.ms)
+            agg["bytes"] += sp.bytes or 0
+            agg["retries"] += sp.retries or 0
+            if sp.outcome != "ok":
+                agg["errors"] += 1
+                agg["last_outcome"] = sp.outcome
+
+    def finish(self, outcome="ok", **meta):
+        """结束本轮并追加到运行指标文件，返回本轮记录。"""
+        with self._lock:
+            if not self._active: return None
+            self._active = False
+            spans = {k: {**v, "ms": round(v["ms"], 1), "max_ms": round(v["max_ms"], 1)} for k, v in self._spans.items()}
+            record = {
+                "run_at": datetime.now(self.beijing_tz).strftime("%Y-%m-%d %H:%M:%S"),
+                "outcome": outcome,
+                "total_ms": round((time.perf_counter() - self._t0) * 1000, 1),
+                **meta,
+                "spans": spans
+            }
+        os.makedirs(os.path.dirname(self.metrics_file) or ".", exist_ok=True)
+        lines = self._read_lines()
+        lines.append(json.dumps(record, ensure_ascii=False))
+        tmp_path = self.metrics_file + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines[-self.keep_runs:]) + "\n")
+        os.replace(tmp_path, self.metrics_file)
+        return record
+
+    def runs(self, last_n=None):
+        records = []
+        for line in self._read_lines():
+            try: records.append(json.loads(line))
+            except: continue
+        return records[-last_n:] if last_n else records
+
+    def summary(self, last_n=50):
+        """
+        最近 last_n 轮的 {名称: {kind, runs, p50_ms, p95_ms, avg_calls, avg_bytes, error_rate}}。
+        阶段取整段耗时；数据源取每轮单次调用的最大耗时 (并发调用时决定该数据源的等待时间)。
+        """
+        runs = self.runs(last_n)
+        out = {"total": self._stats([r["total_ms"] for r in runs], "run", len(runs))} if runs else {}
+        names = {}
+        for r in runs:
+            for name, s in r.get("spans", {}).items():
+                names.setdefault(name, []).append(s)
+        for name, rows in names.items():
+            st = self._stats([s["max_ms"] for s in rows], rows[0].get("kind"), len(rows))
+            st["avg_calls"] = round(sum(s["n"] for s in rows) / len(rows), 1)
+            st["avg_bytes"] = round(sum(s["bytes"] for s in rows) / len(rows))
+            st["error_rate"] = round(sum(s["errors"] for s in rows) / max(1, sum(s["n"] for s in rows)), 3)
+            st["avg_retries"] = round(sum(s["retries"] for s in rows) / len(rows), 2)
+            out[name] = st
+        return out
+
+    def _stats(self, values, kind, n):
+        values = sorted(values)
+        return {"kind": kind, "runs": n, "p50_ms": round(_percentile(values, 50), 1), "p95_ms": round(_percentile(values, 95), 1)}
+
+    def _read_lines(self):
+        if not os.path.exists(self.metrics_file):
+            return []
+        with open(self.metrics_file, 'r', encoding='utf-8') as f:
+            return [l.rstrip("\n") for l in f if l.strip()]
+
+def _percentile(sorted_values, q):
+    """线性插值分位数 (与 numpy.percentile 默认口径一致)。"""
+    if not sorted_values: return 0.0
+    pos = (len(sorted_values) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+TELEMETRY = Telemetry()
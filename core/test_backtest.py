@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+
+# Ensure we can import from core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.bar_store import BarStore
+from core.backtest import Backtester
+
+def _bar(day, close, high=None, low=None, volume=1000.0):
+    return {"日期": day, "开盘": close, "最高": high or close, "最低": low or close, "收盘": close, "成交量": volume, "unit": "SHARE"}
+
+def test_backtest_exits():
+    print("🔍 Testing Backtester trigger / exit rules...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BarStore(tmp)
+        days = [f"2026-01-{d:02d}" for d in range(1, 16)]
+        # A: 第 6 天放量急跌触发 (bias < -2.5, vol ratio > 1.2)，次日最高价触及止盈 +3%
+        a = [_bar(d, 1.0) for d in days[:5]] + [_bar(days[5], 0.95, volume=3000)]
+        a += [_bar(days[6], 0.96, high=0.95 * 1.031)] + [_bar(d, 0.96) for d in days[7:]]
+        # B: 同样触发，次日最低价触及止损 -1.5%
+        b = [_bar(d, 1.0) for d in days[:5]] + [_bar(days[5], 0.95, volume=3000)]
+        b += [_bar(days[6], 0.94, low=0.95 * 0.98)] + [_bar(d, 0.94) for d in days[7:]]
+        # C: 放量但未跌，不触发
+        c = [_bar(d, 1.0) for d in days[:5]] + [_bar(days[5], 1.0, volume=3000)] + [_bar(d, 1.0) for d in days[6:]]
+        for code, bars in [("A", a), ("B", b), ("C", c)]:
+            store.merge(code, bars)
+
+        bt = Backtester(bars_dir=tmp, history_dir=tmp)
+        stats = bt.run()
+        print(f"   stats: {stats}")
+        assert stats["trades"] == 2
+        assert stats["hit_rate"] == 50.0
+        assert stats["avg_return"] == round((3.0 - 1.5) / 2, 3)
+
+        # 持有期内无事件: 到期按收盘价平仓
+        stats = bt.run(stop_loss=-10, take_profit=10, hold_days=2)
+        assert stats["trades"] == 2
+        assert stats["avg_return"] == round(((0.96 / 0.95 - 1) + (0.94 / 0.95 - 1)) * 100 / 2, 3)
+
+        # 网格扫描与单次回测结果一致
+        results = bt.sweep({"bias_th": [-2.5, -10.0]}, processes=2)
+        by_th = {p["bias_th"]: s for p, s in results}
+        assert by_th[-2.5]["trades"] == 2
+        assert by_th[-10.0]["trades"] == 0
+
+    print("✅ Backtester rules verified.")
+
+if __name__ == "__main__":
+    test_backtest_exits()
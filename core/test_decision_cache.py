@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Ensure we can import from core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.decision_cache import DecisionCache
+
+METRICS = {
+    "timestamp": "2026-03-02 10:00",
+    "macro_matrix": {"CNH": {"value": 7.2181, "p_20d": 55.0, "z_score": -0.0}},
+    "macro_health": {"CNH": {"status": "SUCCESS", "last_update": "2026-03-02 10:00"}},
+    "technical_matrix": [{"code": "510300", "bias": -1.23, "vol_ratio": 0.9}]
+}
+
+def test_decision_cache():
+    print("🔍 Testing DecisionCache hit / miss / TTL...")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = DecisionCache(cache_dir=tmp, ttl=3600)
+        key = cache.key(METRICS)
+        assert cache.get(key) is None
+
+        decision = {"decision": "WAIT", "timestamp": METRICS["timestamp"]}
+        cache.put(key, decision)
+        hit, age = cache.get(key)
+        assert hit == decision and age < 60
+
+        # 仅时间戳不同、浮点数在精度内相同 → 同一个键
+        later = json.loads(json.dumps(METRICS))
+        later["timestamp"] = "2026-03-02 11:00"
+        later["macro_health"]["CNH"]["last_update"] = "2026-03-02 11:00"
+        later["macro_matrix"]["CNH"]["value"] = 7.2219
+        later["macro_matrix"]["CNH"]["z_score"] = 0.0
+        assert cache.key(later) == key
+
+        # 实质变化 → 未命中
+        moved = json.loads(json.dumps(METRICS))
+        moved["technical_matrix"][0]["bias"] = -2.6
+        assert cache.key(moved) != key and cache.get(cache.key(moved)) is None
+
+        # 过期: 条目创建时间早于 ttl 之前即视为未命中，并在下次写入时清理
+        path = os.path.join(tmp, f"{key}.json")
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        entry["created_at"] = time.time() - 3601
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        assert cache.get(key) is None
+        cache.put(cache.key(moved), {"decision": "BUY"})
+        assert not os.path.exists(path)
+    print("✅ DecisionCache verified.")
+
+if __name__ == "__main__":
+    test_decision_cache()
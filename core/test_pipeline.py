@@ -0,0 +1,118 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Ensure we can import from core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.pipeline import Pipeline, Stage, file_hash
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _write(path, obj):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(obj, f)
+
+def _pipeline(tmp, calls, fail=()):
+    """snap (采集, always) → metrics (量化) → decision (审计)，calls 记录实际执行的阶段。"""
+    snap, metrics, decision = (os.path.join(tmp, f) for f in ("snap.json", "metrics.json", "decision.json"))
+    source = os.path.join(tmp, "source.json")
+
+    def stage(name, src, dst):
+        def fn():
+            calls.append(name)
+            if name in fail: raise RuntimeError(f"{name} failed")
+            with open(src, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            _write(dst, data)
+            return data
+        return fn
+
+    return Pipeline([
+        Stage("harvest", stage("harvest", source, snap), outputs=[snap], always=True),
+        Stage("quant", stage("quant", snap, metrics), inputs=[snap], outputs=[metrics]),
+        Stage("audit", stage("audit", metrics, decision), inputs=[metrics], outputs=[decision]),
+    ], checkpoint_file=os.path.join(tmp, "checkpoint.json"))
+
+def test_pipeline_skip_and_resume():
+    print("🔍 Testing Pipeline skip / rerun / resume...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source.json")
+        _write(source, {"meta": {"timestamp": "09:30", "cache": {"hits": 0}}, "CNH": {"price": 7.1, "last_update": "09:30"}})
+
+        calls = []
+        assert _pipeline(tmp, calls).run() == {"harvest": "ran", "quant": "ran", "audit": "ran"}
+
+        # 输入未变化: 只重新采集，下游跳过
+        calls.clear()
+        assert _pipeline(tmp, calls).run() == {"harvest": "ran", "quant": "skipped", "audit": "skipped"}
+        assert calls == ["harvest"]
+
+        # 仅时间戳 / 缓存统计等每轮变化的字段不同，同样视为未变化
+        _write(source, {"meta": {"timestamp": "09:35", "cache": {"hits": 3}}, "CNH": {"price": 7.1, "last_update": "09:35"}})
+        calls.clear()
+        assert _pipeline(tmp, calls).run()["quant"] == "skipped"
+
+        # 输入变化: 下游全部重算
+        _write(source, {"meta": {"timestamp": "09:40"}, "CNH": {"price": 7.2, "last_update": "09:40"}})
+        calls.clear()
+        assert _pipeline(tmp, calls).run() == {"harvest": "ran", "quant": "ran", "audit": "ran"}
+
+        # 产物被外部改动: 对应阶段重算
+        _write(os.path.join(tmp, "metrics.json"), {"tampered": True})
+        calls.clear()
+        assert _pipeline(tmp, calls).run()["quant"] == "ran"
+
+        # 阶段失败: 异常外抛，检查点保留上游成功记录与失败阶段
+        _write(source, {"meta": {"timestamp": "09:45"}, "CNH": {"price": 7.3}})
+        calls.clear()
+        try:
+            _pipeline(tmp, calls, fail=("audit",)).run()
+            assert False, "audit failure should propagate"
+        except RuntimeError:
+            pass
+        with open(os.path.join(tmp, "checkpoint.json"), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        assert state["quant"]["status"] == "ok"
+        assert state["audit"]["status"] == "failed" and "audit failed" in state["audit"]["error"]
+
+        # 断点续跑: 复用采集与量化的产物，只重跑失败的审计
+        calls.clear()
+        assert _pipeline(tmp, calls).run(resume=True) == {"harvest": "skipped", "quant": "skipped", "audit": "ran"}
+        assert calls == ["audit"]
+
+        # --force: 忽略检查点全部重跑
+        calls.clear()
+        _pipeline(tmp, calls).run(force=True)
+        assert calls == ["harvest", "quant", "audit"]
+
+        # 目录输入: 忽略 "_" 开头的派生状态
+        bars = os.path.join(tmp, "bars")
+        os.makedirs(bars)
+        before = file_hash(bars)
+        _write(os.path.join(bars, "_indicators.json"), {})
+        assert file_hash(bars) == before
+        _write(os.path.join(bars, "510300.csv"), {})
+        assert file_hash(bars) != before
+    print("✅ Pipeline scheduling verified.")
+
+def test_stage_outputs_tracked():
+    """声明的阶段产物不能是 git 忽略的缓存: 全新检出时产物缺失，阶段将永远无法跳过。"""
+    print("🔍 Testing declared stage outputs are version-controlled...")
+    from main import build_pipeline
+    outputs = [p for macro_only in (False, True) for s in build_pipeline(macro_only=macro_only).stages for p in s.outputs]
+    try:
+        proc = subprocess.run(["git", "check-ignore", *outputs], cwd=ROOT, capture_output=True, text=True)
+    except FileNotFoundError:
+        print("   git unavailable, skipped")
+        return
+    ignored = proc.stdout.split()
+    print(f"   outputs: {sorted(set(outputs))}")
+    assert not ignored, f"git-ignored stage outputs: {ignored}"
+    print("✅ Stage outputs tracked.")
+
+if __name__ == "__main__":
+    test_pipeline_skip_and_resume()
+    test_stage_outputs_tracked()
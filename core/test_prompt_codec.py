@@ -0,0 +1,59 @@
+import os
+import sys
+
+# Ensure we can import from core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.prompt_codec import STALE_FIELDS, compact_metrics, decode_table
+
+METRICS = {
+    "timestamp": "2026-03-02 10:00",
+    "macro_matrix": {
+        "CNH": {"value": 7.215, "change_pct": 0.123, "p_20d": 55.0, "z_score": -0.42, "slope": 0.0012},
+        "Margin_Debt": {"value": 26605.883, "change_pct": 0.08, "p_20d": 100.0, "z_score": 1.0, "slope": 0.0},
+        "A_Share_Vol": {"amplitude": 1.446, "pct_change": -0.383, "p_20d": 10.0, "z_score": -1.65, "slope": 8.555},
+    },
+    "macro_health": {
+        "CNH": {"status": "SUCCESS", "last_update": "2026-03-02 10:00"},
+        "Margin_Debt": {"status": "SUCCESS", "last_update": "2026-02-27 15:00"},
+        "CSI300_Vol": {"status": "SUCCESS", "last_update": "2026-03-02 10:00"},
+    },
+    "technical_matrix": [
+        {"code": "510300", "name": "沪深300ETF", "price": 4.012, "bias": -0.5, "vol_ratio": 0.9},
+        {"code": "513050", "name": "中概互联网ETF", "price": 1.268, "bias": -2.28, "vol_ratio": 1.27},
+        {"code": "512010", "name": "医药ETF", "price": 0.371, "bias": -1.49, "vol_ratio": None},
+    ]
+}
+
+def _sections(text):
+    return {block.split("\n", 1)[0].split(" ")[0].rstrip(":"): block for block in text.split("\n\n")}
+
+def test_compact_round_trip():
+    print("🔍 Testing compact table round trip...")
+    text, stats = compact_metrics(METRICS, top_k=2, priority=["510300"])
+    sections = _sections(text)
+    print(text)
+
+    # 宏观矩阵: 还原后与原指标一致；过期指标 (Margin_Debt，超过 24 小时) 剔除动量字段并标记 stale
+    macro = decode_table(sections["macro_matrix"].split("\n", 1)[1], index="key",
+                         numeric=("value", "change_pct", "p_20d", "z_score", "slope", "amplitude", "pct_change", "stale"))
+    assert set(macro) == set(METRICS["macro_matrix"])
+    for key, row in METRICS["macro_matrix"].items():
+        expected = {k: v for k, v in row.items() if not (key == "Margin_Debt" and k in STALE_FIELDS)}
+        decoded = {k: v for k, v in macro[key].items() if v is not None and k != "stale"}
+        assert decoded == expected, (key, decoded, expected)
+        assert macro[key]["stale"] == (1.0 if key == "Margin_Debt" else 0.0)
+    assert stats["stale"] == ["Margin_Debt"]
+    assert "Margin_Debt: last_update 2026-02-27 15:00" in sections["macro_health"]
+
+    # 技术矩阵: 乖离率最低的 top_k 行 + 规则触发标的，逐行还原
+    tech = decode_table(sections["technical_matrix"].split("\n", 1)[1], numeric=("price", "bias", "vol_ratio"))
+    by_code = {r["code"]: r for r in METRICS["technical_matrix"]}
+    assert [r["code"] for r in tech] == ["513050", "512010", "510300"]
+    for row in tech:
+        assert row == by_code[row["code"]], row
+    assert stats["tech_rows"] == 3 and stats["tech_total"] == 3
+    print("✅ Compact tables decode back to the source metrics.")
+
+if __name__ == "__main__":
+    test_compact_round_trip()
@@ -0,0 +1,54 @@
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 冷启动导入耗时预算 (毫秒)，较慢的机器可通过 V13_IMPORT_BUDGET_SCALE 按倍数整体放宽
+BUDGET_MS = {"core.quant_lab": 400, "core.harvester": 500, "core.general": 400, "main": 800, "core.dashboard_data": 50}
+# 只应在实际用到的代码路径上加载的重型依赖
+HEAVY = ("pandas", "akshare", "yfinance", "google.genai")
+# 看板数据层只在查询历史序列 / 绘制表格时才需要数值库
+DASHBOARD_HEAVY = HEAVY + ("numpy",)
+
+def import_profile(module, heavy=HEAVY):
+    """在全新解释器中以 -X importtime 导入 module，返回 (自身累计耗时 ms, 已加载的重型依赖)。"""
+    code = f"import sys, {module}; print(','.join(m for m in {heavy!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    cumulative = None
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative = int(parts[1]) / 1000
+    heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return cumulative, heavy
+
+def dashboard_heavy_imports():
+    """看板脚本无法脱离 streamlit 运行时导入，改为静态检查其模块级 import。"""
+    with open(os.path.join(ROOT, "streamlit_app.py"), 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.extend(a.name for a in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.append(node.module)
+    return [n for n in names if n.split('.')[0] in {h.split('.')[0] for h in HEAVY} | {"numpy"}]
+
+def test_startup_budget():
+    print("🔍 Testing cold-import budget...")
+    scale = float(os.getenv("V13_IMPORT_BUDGET_SCALE", "1"))
+    for module, budget in BUDGET_MS.items():
+        ms, heavy = import_profile(module, DASHBOARD_HEAVY if module == "core.dashboard_data" else HEAVY)
+        print(f"   - {module}: {ms:.0f} ms (budget {budget * scale:.0f} ms), heavy deps: {heavy or '-'}")
+        assert not heavy, f"{module} eagerly imports {heavy}"
+        assert ms is not None and ms <= budget * scale, f"{module} cold import {ms:.0f} ms > {budget * scale:.0f} ms"
+
+    heavy = dashboard_heavy_imports()
+    print(f"   - streamlit_app: module-level heavy imports: {heavy or '-'}")
+    assert not heavy, f"streamlit_app eagerly imports {heavy}"
+    print("✅ Startup budget respected.")
+
+if __name__ == "__main__":
+    test_startup_budget()
@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+
+# Ensure we can import from core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.telemetry import Telemetry, _percentile
+
+def test_nested_spans():
+    print("🔍 Testing Telemetry spans...")
+    with tempfile.TemporaryDirectory() as tmp:
+        tel = Telemetry(metrics_file=os.path.join(tmp, "run_metrics.jsonl"), keep_runs=3)
+
+        # 未 start() 时只计时不记录
+        with tel.span("idle"): pass
+        assert tel.finish() is None
+
+        tel.start()
+        with tel.span("harvest", kind="stage"):
+            for _ in range(2):
+                with tel.span("sina.kline") as sp:
+                    sp.bytes = 100
+            try:
+                with tel.span("sina.kline") as sp:
+                    sp.retries = 1
+                    raise TimeoutError("slow")
+                assert False, "span must re-raise"
+            except TimeoutError:
+                pass
+        record = tel.finish(outcome="ok", mode="full")
+
+        stage, source = record["spans"]["harvest"], record["spans"]["sina.kline"]
+        print(f"   record: {record['spans']}")
+        assert stage["kind"] == "stage" and stage["n"] == 1 and stage["errors"] == 0
+        assert source["kind"] == "source" and source["n"] == 3
+        assert source["bytes"] == 200 and source["retries"] == 1
+        assert source["errors"] == 1 and source["last_outcome"] == "error: TimeoutError"
+        # 外层阶段的耗时覆盖内层全部调用
+        assert stage["ms"] >= source["ms"]
+        assert record["mode"] == "full" and "idle" not in record["spans"]
+
+        # 只保留最近 keep_runs 轮
+        for _ in range(4):
+            tel.start()
+            tel.finish()
+        assert len(tel.runs()) == 3
+        summary = tel.summary()
+        assert summary["total"]["runs"] == 3
+
+    assert _percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert _percentile([1.0, 2.0, 3.0, 4.0], 95) == 3.85
+    print("✅ Telemetry spans verified.")
+
+if __name__ == "__main__":
+    test_nested_spans()
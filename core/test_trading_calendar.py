@@ -0,0 +1,52 @@
+import json
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+import pytz
+
+# Ensure we can import from core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.trading_calendar import TradingCalendar
+
+TZ = pytz.timezone('Asia/Shanghai')
+
+def _at(day, hm):
+    return TZ.localize(datetime.strptime(f"{day} {hm}", "%Y-%m-%d %H:%M"))
+
+def test_calendar_gate():
+    print("🔍 Testing TradingCalendar gate...")
+    with tempfile.TemporaryDirectory() as tmp:
+        # 2026 年 10 月: 1–8 日国庆休市 (含周四、周五等工作日)
+        days = [date(2026, 10, 1) + timedelta(days=i) for i in range(31)]
+        dates = [d.isoformat() for d in days if d.weekday() < 5 and d.day > 8]
+        cache_file = os.path.join(tmp, "trade_dates.json")
+        # 缓存标记为今天已更新: 不触发联网刷新
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({"updated": datetime.now(TZ).date().isoformat(), "dates": dates}, f)
+        cal = TradingCalendar(cache_file=cache_file)
+
+        cases = [
+            (("2026-10-09", "09:00"), ("macro", "pre_open")),
+            (("2026-10-09", "10:00"), ("full", "morning")),
+            (("2026-10-09", "12:00"), ("macro", "lunch")),
+            (("2026-10-09", "14:00"), ("full", "afternoon")),
+            (("2026-10-09", "15:20"), ("full", "closed")),   # 收盘后 30 分钟内记录收盘数据
+            (("2026-10-09", "16:00"), ("macro", "closed")),
+            (("2026-10-01", "10:00"), ("macro", "closed")),  # 工作日休市: 外盘仍在交易，只采集宏观
+            (("2026-10-03", "10:00"), ("skip", "closed")),   # 周末
+            (("2026-10-11", "10:00"), ("skip", "closed")),
+            (("2027-03-01", "10:00"), ("full", "morning")),  # 超出日历覆盖范围: 退化为工作日规则
+        ]
+        for (day, hm), expected in cases:
+            got = cal.gate(_at(day, hm))
+            print(f"   {day} {hm}: {got}")
+            assert got == expected, (day, hm, got, expected)
+
+        assert not cal.is_trading_day(date(2026, 10, 8))
+        assert cal.is_trading_day(datetime(2026, 10, 12, 9, 0))
+    print("✅ TradingCalendar gate verified.")
+
+if __name__ == "__main__":
+    test_calendar_gate()
@@ -0,0 +1,47 @@
+import json
+import os
+import sys
+import tempfile
+
+# Ensure we can import from core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.bar_store import BarStore
+from core.intel_engine import IntelEngine
+from core.quant_lab import QuantLab
+
+def _bars(days, close):
+    return [{"日期": d, "开盘": close, "最高": close, "最低": close, "收盘": close, "成交量": 1000.0, "unit": "SHARE"} for d in days]
+
+def test_stale_universe_bars():
+    print("🔍 Testing universe bars freshness...")
+    with tempfile.TemporaryDirectory() as tmp:
+        core_dir, universe_dir = os.path.join(tmp, "bars"), os.path.join(tmp, "universe")
+        BarStore(core_dir).merge("510300", _bars([f"2026-03-{d:02d}" for d in range(2, 7)], 4.0))
+        # 本轮抓取的候选: 日线截至前一交易日
+        BarStore(universe_dir).merge("512000", _bars([f"2026-03-{d:02d}" for d in range(2, 7)], 1.0))
+        # 数日前入选、本轮未通过预筛的候选: 存档停留在旧日期，现价相对旧均线乖离极大
+        BarStore(universe_dir).merge("159001", _bars([f"2026-02-{d:02d}" for d in range(2, 7)], 2.0))
+
+        spot = [{"代码": c, "名称": c, "最新价": p, "成交量": 10.0, "涨跌幅": -1.5, "unit": "LOT"}
+                for c, p in [("510300", 4.0), ("512000", 0.97), ("159001", 1.0)]]
+        raw = {"meta": {"timestamp": "2026-03-09 10:00", "kline_codes": ["510300", "512000"]}, "etf_spot": spot, "macro": {}}
+        raw_file = os.path.join(tmp, "snap.json")
+        with open(raw_file, 'w', encoding='utf-8') as f:
+            json.dump(raw, f)
+
+        lab = QuantLab(raw_file=raw_file, out_dir=os.path.join(tmp, "out"), bars_dir=core_dir, universe_bars_dir=universe_dir,
+                       intel=IntelEngine(history_dir=os.path.join(tmp, "history"), features_dir=os.path.join(tmp, "features")))
+        codes = [r["code"] for r in lab.process()["technical_matrix"]]
+        print(f"   technical matrix: {codes}")
+        assert codes == ["512000", "510300"]
+
+        # 旧版快照 (无 kline_codes) 不读取全市场候选的日线
+        del raw["meta"]["kline_codes"]
+        with open(raw_file, 'w', encoding='utf-8') as f:
+            json.dump(raw, f)
+        assert [r["code"] for r in lab.process()["technical_matrix"]] == ["510300"]
+    print("✅ Stale universe bars ignored.")
+
+if __name__ == "__main__":
+    test_stale_universe_bars()
@@ -0,0 +1,110 @@
+import json
+import os
+from datetime import datetime, timedelta
+import pytz
+
+class TradingCalendar:
+    """
+    沪深交易日历: 本地缓存 data/calendar/trade_dates.json，超过 ttl_days 或已用尽 (今天晚于表内末日) 时经 AkShare 刷新。
+    刷新失败且无缓存、或日期超出表的覆盖范围时，退化为 "工作日即交易日"。
+    交易时段 (北京时间): 09:30–11:30 上午盘，11:30–13:00 午休，13:00–15:00 下午盘。
+    """
+    PHASES = ("pre_open", "morning", "lunch", "afternoon", "closed")
+
+    def __init__(self, cache_file="data/calendar/trade_dates.json", ttl_days=30, keep_years=2):
+        self.cache_file = cache_file
+        self.ttl_days = ttl_days
+        self.keep_years = keep_years
+        self.beijing_tz = pytz.timezone('Asia/Shanghai')
+        self._dates = None
+        self._loaded_on = None
+        self._last = None
+
+    def now(self):
+        return datetime.now(self.beijing_tz)
+
+    def is_trading_day(self, day):
+        """day 为 date 或 datetime。"""
+        day = day.date() if isinstance(day, datetime) else day
+        dates = self._trade_dates()
+        if not dates or day.isoformat() > self._last:
+            return day.weekday() < 5
+        return day.isoformat() in dates
+
+    def phase(self, now=None):
+        """返回 pre_open / morning / lunch / afternoon / closed。非交易日全天为 closed。"""
+        now = now or self.now()
+        if not self.is_trading_day(now):
+            return "closed"
+        hm = now.strftime("%H:%M")
+        if hm < "09:30": return "pre_open"
+        if hm < "11:30": return "morning"
+        if hm < "13:00": return "lunch"
+        if hm < "15:00": return "afternoon"
+        return "closed"
+
+    def gate(self, now=None, close_grace_minutes=30):
+        """
+        本轮运行模式 (mode, phase):
+        - full: 盘中，或交易日收盘后 close_grace_minutes 分钟内 (记录收盘数据)
+        - macro: 交易日盘前 / 午休 / 收盘后，以及工作日休市 (外盘仍在交易)，只采集宏观数据、更新历史
+        - skip: 周末
+        """
+        now = now or self.now()
+        phase = self.phase(now)
+        if phase in ("morning", "afternoon"):
+            return "full", phase
+        if self.is_trading_day(now):
+            close_at = now.replace(hour=15, minute=0, second=0, microsecond=0)
+            if phase == "closed" and now < close_at + timedelta(minutes=close_grace_minutes):
+                return "full", phase
+            return "macro", phase
+        return ("skip" if now.weekday() >= 5 else "macro"), phase
+
+    def _trade_dates(self):
+        """每天只加载 (必要时刷新) 一次，常驻进程跨日后自动重新检查。"""
+        today = self.now().date()
+        if self._loaded_on == today:
+            return self._dates
+        self._loaded_on = today
+        cached = self._load()
+        dates = cached["dates"] if cached else None
+        stale = not cached or not dates or dates[-1] < today.isoformat() or \
+            (today - datetime.strptime(cached["updated"], "%Y-%m-%d").date()).days >= self.ttl_days
+        # 年末新一年的日历可能尚未发布: 同一天内只尝试刷新一次
+        if stale and not (cached and cached.get("updated") == today.isoformat()):
+            fetched = self._fetch(today)
+            if fetched:
+                self._save(today, fetched)
+                dates = fetched
+        if dates:
+            self._dates = set(dates)
+            self._last = dates[-1]
+        return self._dates
+
+    def _fetch(self, today):
+        try:
+            import akshare as ak
+            df = ak.tool_trade_date_hist_sina()
+            start = today.replace(year=today.year - self.keep_years, month=1, day=1).isoformat()
+            dates = sorted(str(d)[:10] for d in df["trade_date"])
+            print(f"📅 Trading calendar refreshed: {dates[-1] if dates else 'empty'}")
+            return [d for d in dates if d >= start]
+        except Exception as e:
+            print(f"⚠️ Trading calendar refresh failed: {e}")
+            return None
+
+    def _load(self):
+        if not os.path.exists(self.cache_file):
+            return None
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except: return None
+
+    def _save(self, today, dates):
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        tmp_path = self.cache_file + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"updated": today.isoformat(), "dates": dates}, f)
+        os.replace(tmp_path, self.cache_file)
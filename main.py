@@ -2,44 +2,189 @@ from core.harvester import Harvester
 from core.quant_lab import QuantLab
 from core.general import General
 from core.intel_engine import IntelEngine
+from core.pipeline import Pipeline, Stage
+from core.scheduler import IntradayScheduler
+from core.telemetry import TELEMETRY
+from core.trading_calendar import TradingCalendar
+import argparse
+import json
+import os
 import sys
+import time
 import traceback
+from datetime import datetime
 
-def main():
-    print("--- Global-Link V13: 宏观特征驱动审计开始 ---")
-    
-    try:
-        # 1. 数据采集
-        harvester = Harvester()
-        raw_data = harvester.harvest_all()
-        
-        if not raw_data.get('etf_spot'):
+RAW_SNAP = "data/raw/latest_snap.json"
+HISTORY_TAIL = "data/history/_tail.json"
+METRICS = "data/processed/latest_metrics.json"
+BARS_DIR = "data/bars"
+UNIVERSE_BARS_DIR = "data/universe/bars"
+AUDIT_RESULT = "data/audit_result.json"
+PHASE_LABELS = {"pre_open": "盘前", "morning": "上午盘", "lunch": "午休", "afternoon": "下午盘", "closed": "休市"}
+
+class Components:
+    """
+    流水线各模块的实例。单次运行时用完即弃；常驻模式 (--daemon) 下跨轮复用，
+    HTTP 会话、历史缓存、特征 / 指标状态与模型客户端保持常驻。
+    """
+    def __init__(self):
+        self._instances = {}
+
+    def _get(self, key, factory):
+        if key not in self._instances:
+            self._instances[key] = factory()
+        return self._instances[key]
+
+    @property
+    def harvester(self):
+        # V13_UNIVERSE=1: 全市场 ETF 模式
+        return self._get("harvester", lambda: Harvester(universe=os.getenv("V13_UNIVERSE") == "1"))
+
+    @property
+    def intel(self):
+        return self._get("intel", IntelEngine)
+
+    @property
+    def lab(self):
+        return self._get("lab", lambda: QuantLab(intel=self.intel))
+
+    @property
+    def general(self):
+        # V13_FORCE_REFRESH=1: 忽略决策缓存，强制调用模型
+        return self._get("general", lambda: General(force_refresh=os.getenv("V13_FORCE_REFRESH") == "1"))
+
+    def warm_up(self):
+        self.harvester, self.lab, self.general
+
+def build_pipeline(components=None, macro_only=False):
+    """macro_only: A 股休市时只采集宏观数据并更新历史，不重算技术矩阵、不调用模型。"""
+    c = components or Components()
+
+    def harvest():
+        raw_data = c.harvester.harvest_all(macro_only=macro_only)
+        if not macro_only and not raw_data.get('etf_spot'):
             print("⚠️ 警告: 实时行情为空。")
-        
-        # 2. 宏观特征引擎更新 (V14)
-        intel = IntelEngine()
-        intel.update_history(raw_data)
+        return raw_data
+
+    def update_intel():
+        with open(RAW_SNAP, 'r', encoding='utf-8') as f:
+            raw_data = json.load(f)
+        written = c.intel.update_history(raw_data)
         print("🧠 特征引擎: 历史数据已更新")
-        
+        return written
+
+    if macro_only:
+        # 独立的阶段名: 宏观快照不会被 --resume 当作完整采集结果复用
+        return Pipeline([
+            Stage("harvest_macro", harvest, outputs=[RAW_SNAP], always=True),
+            Stage("intel", update_intel, inputs=[RAW_SNAP], outputs=[HISTORY_TAIL]),
+        ])
+
+    return Pipeline([
+        # 1. 数据采集
+        Stage("harvest", harvest, outputs=[RAW_SNAP], always=True),
+        # 2. 宏观特征引擎更新 (V14)
+        Stage("intel", update_intel, inputs=[RAW_SNAP], outputs=[HISTORY_TAIL]),
         # 3. 量化分析
-        lab = QuantLab()
-        lab.process()
-        
+        # K 线仓库也是输入；指标递推状态 (_indicators.json) 为不入库的派生缓存，缺失时自行从 K 线重建，不登记为产物
+        Stage("quant", lambda: c.lab.process(), inputs=[RAW_SNAP, HISTORY_TAIL, BARS_DIR, UNIVERSE_BARS_DIR], outputs=[METRICS]),
         # 4. AI 策略审计
-        commander = General()
-        decision = commander.audit()
-        
-        if decision:
+        Stage("audit", lambda: c.general.audit(), inputs=[METRICS], outputs=[AUDIT_RESULT]),
+    ])
+
+def run_cycle(components=None, resume=False, force=False, calendar=None):
+    """
+    执行一轮流水线。异常向外抛出 (遥测已落盘)。
+    传入 calendar 时按交易时段决定运行模式: 盘中完整运行，休市时段仅采集宏观，周末跳过 (断点续跑不受限制)。
+    """
+    mode, phase = ("full", None) if calendar is None or resume else calendar.gate()
+    if mode == "skip":
+        print(f"🛌 A 股{PHASE_LABELS[phase]} (非交易日)，本轮跳过")
+        return {}
+    print("--- Global-Link V13: 宏观特征驱动审计开始 ---")
+    if mode == "macro":
+        print(f"🌙 A 股{PHASE_LABELS[phase]}，本轮仅采集宏观数据 (不生成策略决策)")
+    # 运行遥测: 各阶段 / 数据源耗时追加至 data/telemetry/run_metrics.jsonl
+    TELEMETRY.start()
+
+    try:
+        results = build_pipeline(components, macro_only=mode == "macro").run(resume=resume, force=force)
+
+        if mode == "macro":
+            if "failed" not in results.values():
+                print("✅ 宏观历史已更新")
+        elif results.get("audit") == "ran":
+            with open(AUDIT_RESULT, 'r', encoding='utf-8') as f:
+                decision = json.load(f)
             print(f"✅ 策略决策已生成: {decision.get('decision', 'N/A')}")
+        elif results.get("audit") == "skipped":
+            print("✅ 指标未变化，沿用已有策略决策")
         else:
-            print("❌ 策略决策生成失败")
-            
+            failed = [k for k, v in results.items() if v == "failed"]
+            print(f"❌ 策略决策生成失败 (阶段: {', '.join(failed)})，可使用 --resume 从失败阶段重试")
+    except Exception as e:
+        TELEMETRY.finish(outcome=f"error: {type(e).__name__}")
+        raise
+
+    record = TELEMETRY.finish(outcome="ok" if "failed" not in results.values() else "failed", mode=mode, phase=phase, stages=results)
+    stages = [f"{k} {v['ms'] / 1000:.1f}s" for k, v in record["spans"].items() if v["kind"] == "stage" and "." not in k]
+    print(f"⏱️ 本轮耗时 {record['total_ms'] / 1000:.1f}s: {' | '.join(stages) or '全部阶段已跳过'}")
+    print("--- Global-Link V13: 执行任务已完成 ---")
+    return results
+
+def run_daemon(interval_minutes, start, end, calendar=None):
+    """常驻模式: 预热各模块后按盘中时间表循环执行，单轮异常不会终止进程。"""
+    scheduler = IntradayScheduler(interval_minutes, start, end, calendar=calendar)
+    components = Components()
+    t0 = time.perf_counter()
+    components.warm_up()
+    print(f"🔥 常驻模式: 模块预热完成 ({time.perf_counter() - t0:.1f}s)，盘中 {start}–{end} 每 {interval_minutes} 分钟运行一轮")
+    while True:
+        next_at = scheduler.next_run()
+        if next_at is None:
+            print("⚠️ 未来两周内无可运行时段，常驻模式退出")
+            return
+        wait = (next_at - datetime.now(scheduler.beijing_tz)).total_seconds()
+        if wait > 0:
+            print(f"💤 下一轮: {next_at.strftime('%Y-%m-%d %H:%M')} (等待 {wait / 60:.1f} 分钟)")
+            time.sleep(wait)
+        try:
+            run_cycle(components, calendar=calendar)
+        except Exception as e:
+            print(f"💥 本轮异常: {e}")
+            traceback.print_exc()
+        # 保证同一时点只运行一次
+        time.sleep(max(0, (next_at - datetime.now(scheduler.beijing_tz)).total_seconds() + 1))
+
+def main():
+    parser = argparse.ArgumentParser(description="Global-Link V13 审计流水线")
+    parser.add_argument("--resume", action="store_true", help="从上次失败的阶段继续，复用已完成阶段的产物 (不重新采集)")
+    parser.add_argument("--force", action="store_true", help="忽略检查点，所有阶段全部重跑")
+    parser.add_argument("--daemon", action="store_true", help="常驻模式: 模块常驻内存，按盘中时间表循环运行")
+    parser.add_argument("--interval", type=int, default=int(os.getenv("V13_INTERVAL_MINUTES", "5")), help="常驻模式运行间隔 (分钟，默认 5)")
+    parser.add_argument("--start", default="09:30", help="常驻模式每日首轮时刻 (北京时间)")
+    parser.add_argument("--end", default="15:00", help="常驻模式每日末轮时刻 (北京时间)")
+    parser.add_argument("--ignore-calendar", action="store_true", help="忽略交易日历，任何时段都完整运行 (亦可设置 V13_IGNORE_CALENDAR=1)")
+    args = parser.parse_args()
+
+    # 交易日历 (本地缓存 data/calendar/trade_dates.json): 休市时段降级为宏观采集，周末跳过
+    ignore_calendar = args.ignore_calendar or os.getenv("V13_IGNORE_CALENDAR") == "1"
+    calendar = None if ignore_calendar else TradingCalendar()
+
+    if args.daemon:
+        try:
+            run_daemon(args.interval, args.start, args.end, calendar)
+        except KeyboardInterrupt:
+            print("👋 常驻模式已停止")
+        return
+
+    try:
+        run_cycle(resume=args.resume, force=args.force, calendar=calendar)
     except Exception as e:
         print(f"💥 系统异常: {e}")
         traceback.print_exc()
+        print("💡 已完成阶段的产物已记录检查点，可使用 python main.py --resume 继续")
         sys.exit(1)
-    
-    print("--- Global-Link V13: 执行任务已完成 ---")
 
 if __name__ == "__main__":
     main()
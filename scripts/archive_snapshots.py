@@ -0,0 +1,37 @@
+import os
+import json
+import glob
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.snapshot_archive import SnapshotArchive
+
+def migrate(delete=False):
+    """将 data/raw 下零散的 market_snap_*.json 迁移进按交易日分段的压缩归档。"""
+    files = sorted(glob.glob("data/raw/market_snap_*.json"))
+    archive = SnapshotArchive("data/archive")
+    before = sum(os.path.getsize(f) for f in files)
+    migrated = 0
+
+    for f_path in files:
+        try:
+            with open(f_path, 'r', encoding='utf-8') as f:
+                snap = json.load(f)
+            archive.append(snap)
+            # 回读校验后才允许删除原文件
+            if archive.get(snap.get("meta", {}).get("timestamp", "unknown")) != snap:
+                print(f"❌ Verify failed, keeping {f_path}")
+                continue
+            migrated += 1
+            if delete:
+                os.remove(f_path)
+        except Exception as e:
+            print(f"Error archiving {f_path}: {e}")
+
+    after = sum(os.path.getsize(os.path.join(archive.archive_dir, f)) for f in os.listdir(archive.archive_dir))
+    print(f"Archived {migrated}/{len(files)} snapshots: {before / 1024:.0f} KB -> {after / 1024:.0f} KB")
+
+if __name__ == "__main__":
+    migrate(delete="--delete" in sys.argv)
@@ -7,8 +7,20 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from core.intel_engine import IntelEngine
+from core.snapshot_archive import SnapshotArchive
 
 def backfill():
+    engine = IntelEngine(history_dir="data/history")
+
+    # 1. 压缩归档中的快照 (按时间顺序)
+    archive = SnapshotArchive("data/archive")
+    archived = set()
+    for snap in archive.iter_snapshots():
+        engine.update_history(snap)
+        archived.add(snap.get("meta", {}).get("timestamp"))
+    print(f"Replayed {len(archived)} archived snapshots.")
+
+    # 2. 尚未归档的零散快照
     raw_dir = "data/raw"
     files = glob.glob(f"{raw_dir}/market_snap_*.json")
     
@@ -18,12 +30,12 @@ def backfill():
     
     print(f"Found {len(files)} snap files for backfilling...")
     
-    engine = IntelEngine(history_dir="data/history")
-    
     for f_path in files:
         try:
             with open(f_path, 'r', encoding='utf-8') as f:
                 raw_data = json.load(f)
+                if raw_data.get("meta", {}).get("timestamp") in archived:
+                    continue
                 engine.update_history(raw_data)
                 print(f"Processed {os.path.basename(f_path)}")
         except Exception as e:
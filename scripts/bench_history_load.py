@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+from core.history_store import HistoryCache, binary_paths, to_epoch_seconds
+
+def bench(history_dir="data/history", rounds=5):
+    """对比全部历史序列的冷加载耗时: CSV (pandas 解析) vs 二进制列存 (np.load 内存映射)。"""
+    paths = sorted(os.path.join(history_dir, f) for f in os.listdir(history_dir) if f.endswith(".csv"))
+    missing = [p for p in paths if not all(os.path.exists(b) for b in binary_paths(p))]
+    if missing:
+        print(f"⚠️ {len(missing)} series have no binary copy; run scripts/convert_history.py first.")
+        return
+
+    def load_csv():
+        for p in paths:
+            df = pd.read_csv(p)
+            ts = to_epoch_seconds(df["timestamp"])
+            values = df["value"].astype(float).to_numpy()
+            float(values[-1]), int(ts[-1])
+
+    def load_npy():
+        for p in paths:
+            ts_path, val_path = binary_paths(p)
+            ts = np.load(ts_path, mmap_mode='r')
+            values = np.load(val_path, mmap_mode='r')
+            float(values[-1]), int(ts[-1])
+
+    def load_cache():
+        cache = HistoryCache()
+        for p in paths:
+            ts, values = cache.get(p)
+            float(values[-1]), int(ts[-1])
+
+    rows = sum(len(np.load(binary_paths(p)[1], mmap_mode='r')) for p in paths)
+    print(f"{len(paths)} series / {rows} rows, best of {rounds}:")
+    results = {}
+    for name, fn in [("csv (pandas)", load_csv), ("npy (mmap)", load_npy), ("HistoryCache", load_cache)]:
+        best = float("inf")
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        results[name] = best
+        print(f"  {name:<14} {best * 1000:8.2f} ms")
+    print(f"  speedup        {results['csv (pandas)'] / results['npy (mmap)']:8.1f}x")
+
+if __name__ == "__main__":
+    bench()
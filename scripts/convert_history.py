@@ -0,0 +1,18 @@
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.intel_engine import IntelEngine
+
+def convert():
+    """一次性将 data/history/*.csv 转换为二进制列存 (.ts.npy / .val.npy)。CSV 保留为可审阅的主存档。"""
+    engine = IntelEngine(history_dir="data/history")
+    rows = engine.export_binary()
+    for key, n in rows.items():
+        print(f"[+] {key}: {n} rows -> {key}.ts.npy / {key}.val.npy")
+    print(f"Converted {len(rows)} series.")
+
+if __name__ == "__main__":
+    convert()
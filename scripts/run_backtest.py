@@ -0,0 +1,36 @@
+import os
+import sys
+import json
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.backtest import Backtester
+
+def main():
+    bt = Backtester(bars_dir="data/bars", history_dir="data/history")
+    print(f"📚 Panel: {len(bt.panel['codes'])} codes × {len(bt.panel['dates'])} days")
+
+    # 1. 当前 SOP 参数
+    stats = bt.run()
+    print("=== SOP: Bias < -2.5% & Vol Ratio > 1.2 | SL -1.5% | TP 3.0% | 4 days ===")
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+
+    # 2. 参数网格扫描
+    if "--sweep" in sys.argv:
+        grid = {
+            "bias_th": [-1.0, -1.5, -2.0, -2.5, -3.0, -3.5, -4.0, -5.0],
+            "vol_th": [0.8, 1.0, 1.2, 1.5, 2.0],
+            "stop_loss": [-1.0, -1.5, -2.0, -3.0],
+            "take_profit": [2.0, 3.0, 4.0, 5.0],
+            "hold_days": [2, 3, 4, 5, 7],
+        }
+        t0 = time.perf_counter()
+        results = bt.sweep(grid)
+        print(f"\n=== Sweep: {len(results)} combos in {time.perf_counter() - t0:.2f}s (top 10 by avg return) ===")
+        for params, s in results[:10]:
+            print(f"{params} -> trades {s['trades']}, hit {s['hit_rate']}%, avg {s['avg_return']}%, mdd {s['max_drawdown']}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import argparse
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.telemetry import Telemetry
+
+def main():
+    parser = argparse.ArgumentParser(description="最近 N 轮运行的各阶段 / 数据源耗时分位 (data/telemetry/run_metrics.jsonl)")
+    parser.add_argument("--last", type=int, default=50, help="统计最近 N 轮 (默认 50)")
+    parser.add_argument("--file", default="data/telemetry/run_metrics.jsonl")
+    args = parser.parse_args()
+
+    summary = Telemetry(args.file).summary(args.last)
+    if not summary:
+        print("⚠️ 暂无运行记录。")
+        return
+
+    print(f"📊 最近 {summary['total']['runs']} 轮运行耗时 (ms):")
+    print(f"{'name':<42}{'kind':<8}{'runs':>6}{'p50':>10}{'p95':>10}{'calls':>8}{'KB':>9}{'err%':>7}{'retry':>7}")
+    order = sorted(summary.items(), key=lambda kv: ({"run": 0, "stage": 1}.get(kv[1]["kind"], 2), kv[0]))
+    for name, s in order:
+        print(f"{name:<42}{s['kind']:<8}{s['runs']:>6}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}"
+              f"{s.get('avg_calls', 1):>8}{s.get('avg_bytes', 0) / 1024:>9.1f}{s.get('error_rate', 0) * 100:>7.1f}{s.get('avg_retries', 0):>7}")
+
+if __name__ == "__main__":
+    main()
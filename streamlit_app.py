@@ -1,9 +1,8 @@
 import streamlit as st
-import json
 import os
-import pandas as pd
 from datetime import datetime
 import time
+from core.dashboard_data import DashboardData
 
 # 🎨 UI 全面升级：V13 PRO+ 机构级量化决策看板
 st.set_page_config(page_title="Global-Link V13 PRO+", layout="wide", initial_sidebar_state="expanded")
@@ -68,13 +67,6 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-def load_json(path):
-    if os.path.exists(path):
-        try:
-            with open(path, 'r', encoding='utf-8') as f: return json.load(f)
-        except: return None
-    return None
-
 def format_beijing_time(ts_str):
     """统一格式化为：2026-02-10 12:00（北京时间）"""
     if not ts_str or ts_str == "unknown": return "N/A"
@@ -87,8 +79,15 @@ def format_beijing_time(ts_str):
     except: return ts_str
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
-audit_data = load_json(os.path.join(base_dir, 'data', 'audit_result.json'))
-metrics_data = load_json(os.path.join(base_dir, 'data', 'processed', 'latest_metrics.json'))
+
+@st.cache_resource
+def get_data():
+    # 进程级单例: 所有会话共享同一份按 mtime 失效的解析缓存，文件未更新时重绘不再读盘
+    return DashboardData(os.path.join(base_dir, 'data'))
+
+store = get_data()
+audit_data = store.audit_result()
+metrics_data = store.latest_metrics()
 
 # --- 侧边栏 ---
 with st.sidebar:
@@ -208,6 +207,7 @@ if audit_data:
         st.markdown("<h3 style='color: #00f2ff; font-weight:600;'>📊 标的量化监测矩阵</h3>", unsafe_allow_html=True)
         tech = metrics_data.get('technical_matrix', []) if metrics_data else []
         if tech:
+            import pandas as pd
             df = pd.DataFrame(tech).rename(columns={"code":"证券代码","name":"证券名称","price":"现价","bias":"乖离率 %","vol_ratio":"量比"})
             def highlight(s):
                 styles = ['' for _ in s]
@@ -227,6 +227,26 @@ if audit_data:
         log_content = f"[运行日志]<br>[决策引擎已连接: GEMINI-3-FLASH]<br>[执行多维特征深度审计]<br>---------------------------------<br>{rationale}<br>---------------------------------<br>[审计闭环]<br>[系统待命]"
         st.markdown(f"<div class='sys-log'>{log_content}</div>", unsafe_allow_html=True)
 
+    h_col, a_col = st.columns([3, 2])
+    with h_col:
+        with st.expander("📈 宏观历史序列", expanded=False):
+            keys = store.history_keys()
+            key = st.selectbox("指标", keys) if keys else None
+            series = store.history_series(key) if key else None
+            if series is not None and len(series[1]):
+                import pandas as pd
+                ts, values = series
+                st.line_chart(pd.DataFrame({key: values}, index=pd.to_datetime(ts, unit='s')))
+            else: st.info("暂无历史数据")
+
+    with a_col:
+        with st.expander("🗂️ 决策存档", expanded=False):
+            archive = store.decisions(limit=20)
+            if archive:
+                for r in archive:
+                    st.markdown(f"`{format_beijing_time(r['timestamp'])}` **{r['decision']}** → {r['target'] or '-'} (×{r['attack_factor']}, {r['source']})")
+            else: st.info("暂无决策存档")
+
     st.markdown("---")
     st.markdown(f"<p style='text-align: center; color: #8b949e; font-size: 0.8rem;'>V13 PRO+ 机构级决策引擎 | 最后同步时间: {format_beijing_time(ref_time)}</p>", unsafe_allow_html=True)
 else: